@@ -4,14 +4,42 @@ from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from config import Config
 from models import db, User
+from db_pool import init_pool
+from metrics import init_metrics
+from sql_profiler import sql_profiler
+from cache import page_cache
+from compression import compressor
+from snapshot import snapshot_store
+from freeze import init_static_export
+from counters import init_counters
+from contact_queue import contact_queue
+from search import init_search
+from tags import init_tags
+from images import init_images
+from assets import asset_manifest, init_css_bundle
+from templating import init_templates
 from routes.public import public_bp
 from routes.admin import admin_bp
+from routes.api import api_bp
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     
+    init_pool(app)
     db.init_app(app)
+    init_metrics(app)
+    sql_profiler.init_app(app)
+    compressor.init_app(app)
+    page_cache.init_app(app)
+    snapshot_store.init_app(app)
+    init_counters(app)
+    contact_queue.init_app(app)
+    init_search(app)
+    init_tags(app)
+    init_images(app)
+    asset_manifest.init_app(app)
+    init_css_bundle(app)
     
     csrf = CSRFProtect()
     csrf.init_app(app)
@@ -27,6 +55,9 @@ def create_app():
     
     app.register_blueprint(public_bp)
     app.register_blueprint(admin_bp, url_prefix='/admin')
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    
+    init_static_export(app)
     
     @app.errorhandler(404)
     def not_found(e):
@@ -36,6 +67,8 @@ def create_app():
     def server_error(e):
         return render_template('errors/500.html'), 500
     
+    init_templates(app)
+    
     return app
 
 # Create app instance for Gunicorn
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import re
+from threading import Lock
+from flask import send_from_directory
+from markupsafe import Markup
+
+# A year, the longest lifetime caches are expected to honour.
+IMMUTABLE_MAX_AGE = 31536000
+# Build outputs (build_css.py fonts) that already carry a content hash.
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+# Uploaded images (images.py) and their variants, named by their own digest.
+UPLOAD_NAME = re.compile(r'^uploads/images/[0-9a-f]{16}(-\d+)?\.\w+$')
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprinted(rel_path, digest):
+    base, ext = os.path.splitext(rel_path)
+    return f'{base}.{digest[:12]}{ext}'
+
+
+# Maps every file under static/ to a content-hashed name, rewrites
+# url_for('static', ...) to that name and serves hashed names with a
+# far-future immutable Cache-Control. A deploy that changes a file changes its
+# URL, so browsers never need to revalidate.
+class AssetManifest:
+    def __init__(self, app=None):
+        self._lock = Lock()
+        self._forward = {}
+        self._reverse = {}
+        self.static_folder = None
+        self.check_mtime = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['asset_manifest'] = self
+        if not app.config.get('ASSET_FINGERPRINTING', True):
+            return
+        self.static_folder = app.static_folder
+        # Development edits files in place; production builds the map once.
+        self.check_mtime = app.debug
+        self.build()
+        app.url_defaults(self._url_defaults)
+        app.view_functions['static'] = self.send_static
+
+    def build(self):
+        with self._lock:
+            self._forward.clear()
+            self._reverse.clear()
+        for root, dirs, files in os.walk(self.static_folder):
+            for name in files:
+                rel_path = os.path.relpath(os.path.join(root, name), self.static_folder).replace(os.sep, '/')
+                self._add(rel_path)
+
+    def items(self):
+        with self._lock:
+            return {rel_path: hashed for rel_path, (hashed, mtime) in self._forward.items()}
+
+    def _add(self, rel_path):
+        path = os.path.join(self.static_folder, rel_path)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        hashed = rel_path if HASHED_NAME.search(rel_path) else fingerprinted(rel_path, file_hash(path))
+        with self._lock:
+            self._forward[rel_path] = (hashed, mtime)
+            self._reverse[hashed] = rel_path
+        return hashed
+
+    def lookup(self, rel_path):
+        entry = self._forward.get(rel_path)
+        if entry is not None:
+            if not self.check_mtime:
+                return entry[0]
+            try:
+                if os.stat(os.path.join(self.static_folder, rel_path)).st_mtime == entry[1]:
+                    return entry[0]
+            except OSError:
+                return rel_path
+        # Files uploaded after startup are hashed on first use.
+        return self._add(rel_path) or rel_path
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.lookup(values['filename'])
+
+    def send_static(self, filename):
+        rel_path = self._reverse.get(filename)
+        if rel_path is None and UPLOAD_NAME.match(filename):
+            rel_path = filename
+        if rel_path is None:
+            return send_from_directory(self.static_folder, filename)
+        response = send_from_directory(self.static_folder, rel_path, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+asset_manifest = AssetManifest()
+
+
+def load_css_bundle(static_folder):
+    # The stylesheet bundle written by build_css.py, with the critical CSS
+    # read in for inlining, or None if it has not been built.
+    path = os.path.join(static_folder, 'dist', 'bundle.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        bundle = json.load(f)
+    with open(os.path.join(static_folder, bundle['critical']), encoding='utf-8') as f:
+        bundle['critical'] = Markup(f.read())
+    return bundle
+
+
+def init_css_bundle(app):
+    # base.html falls back to the CDN stylesheets when this is None.
+    app.jinja_env.globals['css_bundle'] = load_css_bundle(app.static_folder)
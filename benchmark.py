@@ -0,0 +1,388 @@
+import argparse
+import http.client
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmark-results')
+CSRF_RE = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+ADMIN_PASSWORD = 'benchmark'
+
+
+class Client:
+    # One keep-alive connection with a cookie jar, like a single browser tab.
+    def __init__(self, port, accept_encoding):
+        self.port = port
+        self.accept_encoding = accept_encoding
+        self.cookies = SimpleCookie()
+        self.connection = None
+
+    def request(self, method, path, form=None, accept_encoding=None):
+        headers = {'Accept-Encoding': accept_encoding or self.accept_encoding}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{key}={morsel.value}' for key, morsel in self.cookies.items())
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        for attempt in (1, 2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                self.connection.close()
+                self.connection = None
+                if attempt == 2:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            self.cookies.load(header)
+        return response.status, data
+
+    def csrf_token(self, path):
+        status, data = self.request('GET', path, accept_encoding='identity')
+        match = CSRF_RE.search(data.decode('utf-8', 'replace'))
+        if not match:
+            raise RuntimeError(f'No CSRF token on {path} (HTTP {status})')
+        return match.group(1)
+
+
+# Each scenario is (setup, request): setup(client) runs once per simulated
+# user before timing starts and returns the state request(client, state) uses.
+def _no_setup(client):
+    return None
+
+
+def _get(path):
+    def run(client, state):
+        return client.request('GET', path)[0]
+    return run
+
+
+def _contact_setup(client):
+    return {'token': client.csrf_token('/contact'), 'sent': 0}
+
+
+def _contact_post(client, state):
+    state['sent'] += 1
+    return client.request('POST', '/contact', {
+        'csrf_token': state['token'],
+        'name': 'Load Test',
+        'email': 'load@example.com',
+        'subject': f'Benchmark message {state["sent"]}',
+        'message': 'This message was sent by benchmark.py to measure the contact form.',
+    })[0]
+
+
+def _admin_setup(client):
+    token = client.csrf_token('/admin/login')
+    status, _ = client.request('POST', '/admin/login', {
+        'csrf_token': token, 'username': 'admin', 'password': ADMIN_PASSWORD,
+    })
+    if status != 302:
+        raise RuntimeError(f'Admin login failed (HTTP {status})')
+    return None
+
+
+SCENARIOS = {
+    'index': (_no_setup, _get('/')),
+    'projects': (_no_setup, _get('/projects')),
+    'contact': (_contact_setup, _contact_post),
+    'messages': (_admin_setup, _get('/admin/messages')),
+    'messages-unread': (_admin_setup, _get('/admin/messages?status=unread')),
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(port, name, concurrency, duration, warmup, accept_encoding):
+    setup, request = SCENARIOS[name]
+    latencies = [[] for _ in range(concurrency)]
+    statuses = [{} for _ in range(concurrency)]
+    errors = [0] * concurrency
+    ready = threading.Barrier(concurrency + 1)
+    go = threading.Event()
+    timing = {}
+    setup_errors = []
+
+    def user(index):
+        client = Client(port, accept_encoding)
+        try:
+            state = setup(client)
+        except Exception as exc:
+            setup_errors.append(exc)
+            ready.abort()
+            return
+        try:
+            ready.wait()
+        except threading.BrokenBarrierError:
+            return
+        go.wait()
+        while time.perf_counter() < timing['warmup_end']:
+            try:
+                request(client, state)
+            except Exception:
+                errors[index] += 1
+        own_latencies, own_statuses = latencies[index], statuses[index]
+        while True:
+            start = time.perf_counter()
+            if start >= timing['end']:
+                break
+            try:
+                status = request(client, state)
+            except Exception:
+                errors[index] += 1
+                continue
+            own_latencies.append(time.perf_counter() - start)
+            own_statuses[status] = own_statuses.get(status, 0) + 1
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    try:
+        ready.wait()
+    except threading.BrokenBarrierError:
+        for thread in threads:
+            thread.join()
+        raise RuntimeError(f'{name}: setup failed: {setup_errors[0]!r}')
+    timing['warmup_end'] = time.perf_counter() + warmup
+    timing['end'] = timing['warmup_end'] + duration
+    go.set()
+    for thread in threads:
+        thread.join()
+
+    values = sorted(value for own in latencies for value in own)
+    status_counts = {}
+    for own in statuses:
+        for status, count in own.items():
+            status_counts[str(status)] = status_counts.get(str(status), 0) + count
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        'requests': len(values),
+        'errors': sum(errors),
+        'statuses': status_counts,
+        'throughput_rps': round(len(values) / duration, 2),
+        'latency_ms': {
+            'mean': ms(sum(values) / len(values)) if values else None,
+            'p50': ms(percentile(values, 0.50)),
+            'p95': ms(percentile(values, 0.95)),
+            'p99': ms(percentile(values, 0.99)),
+            'max': ms(values[-1]) if values else None,
+        },
+    }
+
+
+def _server_env(args, workdir):
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': args.database_url,
+        'SESSION_SECRET': 'benchmark-secret',
+        'ADMIN_PASSWORD': ADMIN_PASSWORD,
+        'POPULATE_DEMO_DATA': 'true',
+        'CONTACT_QUEUE_SPOOL_DIR': os.path.join(workdir, 'contact_spool'),
+        'METRICS_DIR': os.path.join(workdir, 'metrics'),
+        'STATIC_EXPORT_DIR': '',
+        'GUNICORN_BIND': f'127.0.0.1:{args.port}',
+        'GUNICORN_ACCESS_LOG': '/dev/null',
+    })
+    if args.workers:
+        env['GUNICORN_WORKERS'] = str(args.workers)
+    return env
+
+
+def seed(args, env):
+    # A fresh database seeded through populate_db, in a child process so the
+    # benchmark's own process never imports the app.
+    code = (
+        'from app import create_app\n'
+        'from populate_db import populate_database, seed_scale\n'
+        'app = create_app()\n'
+        'populate_database(app)\n'
+        f'seed_scale(app, {args.projects}, {args.messages}, {args.seed})\n'
+    )
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def start_server(args, env, workdir):
+    if args.server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', 'app:app']
+    else:
+        command = [sys.executable, os.path.abspath(__file__), 'serve', '--port', str(args.port)]
+    log = open(os.path.join(workdir, 'server.log'), 'wb')
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited; see {log.name}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', args.port, timeout=2)
+            connection.request('GET', '/')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'Server did not start within 60s; see {log.name}')
+
+
+def serve(port):
+    # The development server, threaded, for machines without gunicorn.
+    from werkzeug.serving import make_server
+    from app import create_app
+    make_server('127.0.0.1', port, create_app(), threaded=True).serve_forever()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='portfolio-bench-')
+    if not args.database_url:
+        args.database_url = f'sqlite:///{os.path.join(workdir, "bench.db")}'
+    env = _server_env(args, workdir)
+    print(f'Seeding {args.projects} projects and {args.messages} messages...')
+    seed_seconds = seed(args, env)
+
+    process = start_server(args, env, workdir)
+    results = {}
+    try:
+        for name in args.scenarios:
+            print(f'{name}: {args.concurrency} users for {args.duration}s...', flush=True)
+            results[name] = run_scenario(args.port, name, args.concurrency, args.duration, args.warmup,
+                                         args.accept_encoding)
+            latency = results[name]['latency_ms']
+            print(f'  {results[name]["throughput_rps"]} req/s  p50 {latency["p50"]} ms  '
+                  f'p95 {latency["p95"]} ms  p99 {latency["p99"]} ms  statuses {results[name]["statuses"]}'
+                  + (f'  errors {results[name]["errors"]}' if results[name]['errors'] else ''))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    report = {
+        'commit': git_commit(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {
+            'server': args.server,
+            'workers': args.workers,
+            'database': args.database_url.split(':', 1)[0],
+            'projects': args.projects,
+            'messages': args.messages,
+            'seed': args.seed,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'accept_encoding': args.accept_encoding,
+        },
+        'seed_seconds': round(seed_seconds, 2),
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote {args.output}')
+    if args.keep:
+        print(f'Database and server log kept in {workdir}')
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(baseline_path, candidate_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+    print(f'{"scenario":<18}{"metric":<16}{baseline.get("commit") or "baseline":>14}'
+          f'{candidate.get("commit") or "candidate":>14}{"change":>10}')
+    for name, result in candidate['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        rows = [('req/s', before['throughput_rps'], result['throughput_rps'])]
+        rows += [(f'{key} ms', before['latency_ms'][key], result['latency_ms'][key]) for key in ('p50', 'p95', 'p99')]
+        for metric, old, new in rows:
+            change = f'{(new - old) / old * 100:+.1f}%' if old and new is not None else '-'
+            print(f'{name:<18}{metric:<16}{old!s:>14}{new!s:>14}{change:>10}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the public and admin pages.')
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help='seed a database, start the app and measure it (default)')
+    run_parser.add_argument('--database-url', help='database to seed (default: a temporary SQLite file); '
+                                                   'populate_db resets its demo content')
+    run_parser.add_argument('--projects', type=int, default=1000)
+    run_parser.add_argument('--messages', type=int, default=10000)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--scenarios', type=lambda value: value.split(','), default=list(SCENARIOS),
+                            help=f'comma-separated subset of: {", ".join(SCENARIOS)}')
+    run_parser.add_argument('--concurrency', type=int, default=8, help='simultaneous simulated users')
+    run_parser.add_argument('--duration', type=float, default=10, help='measured seconds per scenario')
+    run_parser.add_argument('--warmup', type=float, default=2, help='unmeasured seconds per scenario')
+    run_parser.add_argument('--server', choices=('gunicorn', 'werkzeug'), default='gunicorn')
+    run_parser.add_argument('--workers', type=int, help='gunicorn workers (default: gunicorn.conf.py)')
+    run_parser.add_argument('--port', type=int, default=5099)
+    run_parser.add_argument('--accept-encoding', default='gzip, br')
+    run_parser.add_argument('--output', help='result file (default: benchmark-results/<date>-<commit>.json)')
+    run_parser.add_argument('--keep', action='store_true', help='keep the temporary database and server log')
+
+    compare_parser = commands.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+
+    serve_parser = commands.add_parser('serve')
+    serve_parser.add_argument('--port', type=int, required=True)
+
+    argv = sys.argv[1:]
+    if not argv or argv[0].startswith('-'):
+        argv = ['run'] + argv
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        serve(args.port)
+    elif args.command == 'compare':
+        compare(args.baseline, args.candidate)
+    else:
+        unknown = set(args.scenarios) - set(SCENARIOS)
+        if unknown:
+            parser.error(f'unknown scenario(s): {", ".join(sorted(unknown))}')
+        if not args.output:
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+            args.output = os.path.join(RESULTS_DIR, f'{stamp}-{git_commit() or "unknown"}.json')
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,583 @@
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import re
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+BUNDLE_FILE = os.path.join(DIST_DIR, 'bundle.json')
+
+# Template text before this comment is what a visitor sees before scrolling;
+# its utilities are inlined into base.html. Templates without the marker
+# contribute the first CRITICAL_CHARS characters of their content block.
+CRITICAL_MARKER = '{# below-the-fold #}'
+CRITICAL_CHARS = 3000
+
+# Social icons an admin is likely to add after a build; their glyphs are kept
+# in the brands subset even if no SocialLink uses them yet.
+COMMON_BRAND_ICONS = (
+    'linkedin', 'linkedin-in', 'github', 'gitlab', 'twitter', 'x-twitter', 'facebook', 'instagram',
+    'youtube', 'stack-overflow', 'medium', 'dev', 'discord', 'telegram', 'whatsapp', 'mastodon',
+)
+
+SCREENS = {'sm': 640, 'md': 768, 'lg': 1024, 'xl': 1280, '2xl': 1536}
+PSEUDO_VARIANTS = {'hover': ':hover', 'focus': ':focus', 'active': ':active', 'disabled': ':disabled'}
+
+# Tailwind CSS v3 default palette, restricted to the hues this site uses.
+PALETTE = {
+    'gray': {50: 'f9fafb', 100: 'f3f4f6', 200: 'e5e7eb', 300: 'd1d5db', 400: '9ca3af', 500: '6b7280',
+             600: '4b5563', 700: '374151', 800: '1f2937', 900: '111827', 950: '030712'},
+    'cyan': {50: 'ecfeff', 100: 'cffafe', 200: 'a5f3fc', 300: '67e8f9', 400: '22d3ee', 500: '06b6d4',
+             600: '0891b2', 700: '0e7490', 800: '155e75', 900: '164e63', 950: '083344'},
+    'green': {50: 'f0fdf4', 100: 'dcfce7', 200: 'bbf7d0', 300: '86efac', 400: '4ade80', 500: '22c55e',
+              600: '16a34a', 700: '15803d', 800: '166534', 900: '14532d', 950: '052e16'},
+    'blue': {50: 'eff6ff', 100: 'dbeafe', 200: 'bfdbfe', 300: '93c5fd', 400: '60a5fa', 500: '3b82f6',
+             600: '2563eb', 700: '1d4ed8', 800: '1e40af', 900: '1e3a8a', 950: '172554'},
+    'red': {50: 'fef2f2', 100: 'fee2e2', 200: 'fecaca', 300: 'fca5a5', 400: 'f87171', 500: 'ef4444',
+            600: 'dc2626', 700: 'b91c1c', 800: '991b1b', 900: '7f1d1d', 950: '450a0a'},
+    'yellow': {50: 'fefce8', 100: 'fef9c3', 200: 'fef08a', 300: 'fde047', 400: 'facc15', 500: 'eab308',
+               600: 'ca8a04', 700: 'a16207', 800: '854d0e', 900: '713f12', 950: '422006'},
+    'purple': {50: 'faf5ff', 100: 'f3e8ff', 200: 'e9d5ff', 300: 'd8b4fe', 400: 'c084fc', 500: 'a855f7',
+               600: '9333ea', 700: '7e22ce', 800: '6b21a8', 900: '581c87', 950: '3b0764'},
+}
+NAMED_COLORS = {'white': 'ffffff', 'black': '000000'}
+
+FONT_SIZES = {
+    'xs': ('0.75rem', '1rem'), 'sm': ('0.875rem', '1.25rem'), 'base': ('1rem', '1.5rem'),
+    'lg': ('1.125rem', '1.75rem'), 'xl': ('1.25rem', '1.75rem'), '2xl': ('1.5rem', '2rem'),
+    '3xl': ('1.875rem', '2.25rem'), '4xl': ('2.25rem', '2.5rem'), '5xl': ('3rem', '1'),
+    '6xl': ('3.75rem', '1'), '7xl': ('4.5rem', '1'), '8xl': ('6rem', '1'), '9xl': ('8rem', '1'),
+}
+FONT_WEIGHTS = {'light': 300, 'normal': 400, 'medium': 500, 'semibold': 600, 'bold': 700, 'extrabold': 800}
+MAX_WIDTHS = {'xs': '20rem', 'sm': '24rem', 'md': '28rem', 'lg': '32rem', 'xl': '36rem', '2xl': '42rem',
+              '3xl': '48rem', '4xl': '56rem', '5xl': '64rem', '6xl': '72rem', '7xl': '80rem', 'full': '100%'}
+RADII = {'': '0.25rem', 'sm': '0.125rem', 'md': '0.375rem', 'lg': '0.5rem', 'xl': '0.75rem',
+         '2xl': '1rem', 'full': '9999px', 'none': '0px'}
+LEADINGS = {'none': '1', 'tight': '1.25', 'snug': '1.375', 'normal': '1.5', 'relaxed': '1.625', 'loose': '2'}
+BLURS = {'': '8px', 'sm': '4px', 'md': '12px', 'lg': '16px', 'xl': '24px'}
+GRADIENT_DIRECTIONS = {'t': 'top', 'tr': 'top right', 'r': 'right', 'br': 'bottom right',
+                       'b': 'bottom', 'bl': 'bottom left', 'l': 'left', 'tl': 'top left'}
+SHADOWS = {
+    '': ('0 1px 3px 0 {c}, 0 1px 2px -1px {c}', 'rgb(0 0 0 / 0.1)'),
+    'md': ('0 4px 6px -1px {c}, 0 2px 4px -2px {c}', 'rgb(0 0 0 / 0.1)'),
+    'lg': ('0 10px 15px -3px {c}, 0 4px 6px -4px {c}', 'rgb(0 0 0 / 0.1)'),
+    'xl': ('0 20px 25px -5px {c}, 0 8px 10px -6px {c}', 'rgb(0 0 0 / 0.1)'),
+}
+BOX_SHADOW = 'box-shadow:var(--tw-ring-offset-shadow,0 0 #0000),var(--tw-ring-shadow,0 0 #0000),var(--tw-shadow,0 0 #0000)'
+TRANSFORM = ('transform:translate(var(--tw-translate-x,0),var(--tw-translate-y,0)) rotate(var(--tw-rotate,0)) '
+             'scale(var(--tw-scale-x,1),var(--tw-scale-y,1))')
+
+STATIC_UTILITIES = {
+    'block': 'display:block', 'inline-block': 'display:inline-block', 'inline': 'display:inline',
+    'flex': 'display:flex', 'inline-flex': 'display:inline-flex', 'grid': 'display:grid',
+    'hidden': 'display:none',
+    'flex-row': 'flex-direction:row', 'flex-col': 'flex-direction:column', 'flex-wrap': 'flex-wrap:wrap',
+    'flex-1': 'flex:1 1 0%', 'flex-none': 'flex:none', 'flex-shrink-0': 'flex-shrink:0',
+    'items-start': 'align-items:flex-start', 'items-center': 'align-items:center', 'items-end': 'align-items:flex-end',
+    'justify-start': 'justify-content:flex-start', 'justify-center': 'justify-content:center',
+    'justify-between': 'justify-content:space-between', 'justify-end': 'justify-content:flex-end',
+    'col-span-full': 'grid-column:1/-1',
+    'static': 'position:static', 'fixed': 'position:fixed', 'absolute': 'position:absolute',
+    'relative': 'position:relative', 'sticky': 'position:sticky',
+    'overflow-hidden': 'overflow:hidden', 'overflow-auto': 'overflow:auto', 'overflow-x-auto': 'overflow-x:auto',
+    'object-cover': 'object-fit:cover', 'object-contain': 'object-fit:contain',
+    'cursor-pointer': 'cursor:pointer', 'cursor-move': 'cursor:move',
+    'italic': 'font-style:italic', 'not-italic': 'font-style:normal',
+    'uppercase': 'text-transform:uppercase', 'lowercase': 'text-transform:lowercase', 'capitalize': 'text-transform:capitalize',
+    'underline': 'text-decoration-line:underline',
+    'text-left': 'text-align:left', 'text-center': 'text-align:center', 'text-right': 'text-align:right',
+    'whitespace-nowrap': 'white-space:nowrap', 'whitespace-pre-line': 'white-space:pre-line',
+    'whitespace-pre-wrap': 'white-space:pre-wrap', 'break-all': 'word-break:break-all',
+    'break-words': 'overflow-wrap:break-word', 'truncate': 'overflow:hidden;text-overflow:ellipsis;white-space:nowrap',
+    'font-mono': 'font-family:ui-monospace,SFMono-Regular,Menlo,Monaco,Consolas,"Liberation Mono","Courier New",monospace',
+    'font-sans': 'font-family:ui-sans-serif,system-ui,sans-serif',
+    'outline-none': 'outline:2px solid transparent;outline-offset:2px',
+    'transition': ('transition-property:color,background-color,border-color,text-decoration-color,fill,stroke,'
+                   'opacity,box-shadow,transform,filter,backdrop-filter;'
+                   'transition-timing-function:cubic-bezier(0.4,0,0.2,1);transition-duration:150ms'),
+    'transform': TRANSFORM,
+    'container': 'width:100%',
+    'mx-auto': 'margin-left:auto;margin-right:auto',
+    'min-h-screen': 'min-height:100vh', 'h-screen': 'height:100vh',
+    'resize-none': 'resize:none', 'select-none': 'user-select:none',
+    'sr-only': ('position:absolute;width:1px;height:1px;padding:0;margin:-1px;overflow:hidden;'
+                'clip:rect(0,0,0,0);white-space:nowrap;border-width:0'),
+}
+
+PREFLIGHT = (
+    '*,::before,::after{box-sizing:border-box;border-width:0;border-style:solid;border-color:#e5e7eb}'
+    'html{line-height:1.5;-webkit-text-size-adjust:100%;tab-size:4;'
+    'font-family:ui-sans-serif,system-ui,-apple-system,"Segoe UI",Roboto,"Helvetica Neue",Arial,sans-serif}'
+    'body{margin:0;line-height:inherit}'
+    'hr{height:0;color:inherit;border-top-width:1px}'
+    'h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}'
+    'a{color:inherit;text-decoration:inherit}'
+    'b,strong{font-weight:bolder}'
+    'code,kbd,samp,pre{font-family:ui-monospace,SFMono-Regular,Menlo,Monaco,Consolas,monospace;font-size:1em}'
+    'table{text-indent:0;border-color:inherit;border-collapse:collapse}'
+    'button,input,optgroup,select,textarea{font-family:inherit;font-size:100%;font-weight:inherit;'
+    'line-height:inherit;color:inherit;margin:0;padding:0}'
+    'button,select{text-transform:none}'
+    'button,[type=button],[type=reset],[type=submit]{-webkit-appearance:button;background-color:transparent;background-image:none}'
+    'blockquote,dl,dd,h1,h2,h3,h4,h5,h6,hr,figure,p,pre{margin:0}'
+    'ol,ul{list-style:none;margin:0;padding:0}'
+    'textarea{resize:vertical}'
+    'input::placeholder,textarea::placeholder{opacity:1;color:#9ca3af}'
+    'button,[role=button]{cursor:pointer}'
+    'img,svg,video,canvas,audio,iframe,embed,object{display:block;vertical-align:middle}'
+    'img,video{max-width:100%;height:auto}'
+    '[hidden]{display:none}'
+)
+
+CANDIDATE_RE = re.compile(r'[A-Za-z0-9_\-:/.\[\]]+')
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if number >= 0 else None
+
+
+def _rem(number):
+    if number == 0:
+        return '0px'
+    return f'{number * 0.25:g}rem'
+
+
+def spacing(value):
+    if value == 'px':
+        return '1px'
+    number = _number(value)
+    if number is not None and (number * 2).is_integer():
+        return _rem(number)
+    return None
+
+
+def size(value, axis):
+    if value == 'full':
+        return '100%'
+    if value == 'auto':
+        return 'auto'
+    if value == 'screen':
+        return '100vw' if axis == 'x' else '100vh'
+    if re.fullmatch(r'\d+/\d+', value):
+        numerator, denominator = (int(part) for part in value.split('/'))
+        if denominator:
+            return f'{numerator / denominator * 100:g}%'
+    return spacing(value)
+
+
+def color(value):
+    value, _, alpha = value.partition('/')
+    if value == 'transparent':
+        return 'transparent'
+    if value == 'current':
+        return 'currentColor'
+    hex_value = NAMED_COLORS.get(value)
+    if hex_value is None:
+        hue, _, shade = value.rpartition('-')
+        if hue not in PALETTE or not shade.isdigit():
+            return None
+        hex_value = PALETTE[hue].get(int(shade))
+        if hex_value is None:
+            return None
+    r, g, b = (int(hex_value[i:i + 2], 16) for i in (0, 2, 4))
+    if not alpha:
+        return f'rgb({r} {g} {b})'
+    if not alpha.isdigit() or int(alpha) > 100:
+        return None
+    return f'rgb({r} {g} {b} / {int(alpha) / 100:g})'
+
+
+def transparent(value):
+    # The "to" end of a gradient that only sets "from": the same colour at 0.
+    rgb = color(value.partition('/')[0])
+    return rgb.replace(')', ' / 0)') if rgb and rgb.startswith('rgb(') else 'transparent'
+
+
+SIDES = {
+    'p': ('padding',), 'px': ('padding-left', 'padding-right'), 'py': ('padding-top', 'padding-bottom'),
+    'pt': ('padding-top',), 'pr': ('padding-right',), 'pb': ('padding-bottom',), 'pl': ('padding-left',),
+    'm': ('margin',), 'mx': ('margin-left', 'margin-right'), 'my': ('margin-top', 'margin-bottom'),
+    'mt': ('margin-top',), 'mr': ('margin-right',), 'mb': ('margin-bottom',), 'ml': ('margin-left',),
+}
+BORDER_SIDES = {'': ('border-width',), 't': ('border-top-width',), 'r': ('border-right-width',),
+                'b': ('border-bottom-width',), 'l': ('border-left-width',),
+                'x': ('border-left-width', 'border-right-width'), 'y': ('border-top-width', 'border-bottom-width')}
+
+
+def utility(name):
+    # Returns (selector template, declarations) for a bare utility name, or
+    # None if it is not one. "{}" in the template is the escaped class selector.
+    if name in STATIC_UTILITIES:
+        return '{}', STATIC_UTILITIES[name]
+
+    match = re.fullmatch(r'(-?)(p|px|py|pt|pr|pb|pl|m|mx|my|mt|mr|mb|ml)-(.+)', name)
+    if match:
+        negative, key, value = match.groups()
+        amount = 'auto' if value == 'auto' and key.startswith('m') and not negative else spacing(value)
+        if amount is None or (negative and not key.startswith('m')):
+            return None
+        if negative and amount != '0px':
+            amount = f'-{amount}'
+        return '{}', ';'.join(f'{prop}:{amount}' for prop in SIDES[key])
+
+    match = re.fullmatch(r'gap(?:-([xy]))?-(.+)', name)
+    if match and spacing(match.group(2)):
+        prop = {'x': 'column-gap', 'y': 'row-gap', None: 'gap'}[match.group(1)]
+        return '{}', f'{prop}:{spacing(match.group(2))}'
+
+    match = re.fullmatch(r'space-([xy])-(.+)', name)
+    if match and spacing(match.group(2)):
+        prop = 'margin-left' if match.group(1) == 'x' else 'margin-top'
+        return '{} > :not([hidden]) ~ :not([hidden])', f'{prop}:{spacing(match.group(2))}'
+
+    match = re.fullmatch(r'(w|h|min-w|min-h|max-h)-(.+)', name)
+    if match:
+        axis = 'x' if match.group(1).endswith('w') else 'y'
+        value = size(match.group(2), axis)
+        prop = {'w': 'width', 'h': 'height', 'min-w': 'min-width', 'min-h': 'min-height', 'max-h': 'max-height'}[match.group(1)]
+        return ('{}', f'{prop}:{value}') if value else None
+
+    match = re.fullmatch(r'max-w-(.+)', name)
+    if match and match.group(1) in MAX_WIDTHS:
+        return '{}', f'max-width:{MAX_WIDTHS[match.group(1)]}'
+
+    match = re.fullmatch(r'(-?)(top|right|bottom|left|inset)-(.+)', name)
+    if match:
+        negative, prop, value = match.groups()
+        amount = size(value, 'x')
+        if amount is None:
+            return None
+        if negative and amount != '0px':
+            amount = f'-{amount}'
+        return '{}', f'{prop}:{amount}'
+
+    match = re.fullmatch(r'text-(.+)', name)
+    if match:
+        value = match.group(1)
+        if value in FONT_SIZES:
+            font_size, line_height = FONT_SIZES[value]
+            return '{}', f'font-size:{font_size};line-height:{line_height}'
+        return ('{}', f'color:{color(value)}') if color(value) else None
+
+    match = re.fullmatch(r'font-(.+)', name)
+    if match and match.group(1) in FONT_WEIGHTS:
+        return '{}', f'font-weight:{FONT_WEIGHTS[match.group(1)]}'
+
+    match = re.fullmatch(r'leading-(.+)', name)
+    if match and match.group(1) in LEADINGS:
+        return '{}', f'line-height:{LEADINGS[match.group(1)]}'
+
+    match = re.fullmatch(r'bg-gradient-to-(.+)', name)
+    if match and match.group(1) in GRADIENT_DIRECTIONS:
+        return '{}', f'background-image:linear-gradient(to {GRADIENT_DIRECTIONS[match.group(1)]},var(--tw-gradient-stops))'
+
+    match = re.fullmatch(r'bg-(.+)', name)
+    if match and color(match.group(1)):
+        return '{}', f'background-color:{color(match.group(1))}'
+
+    match = re.fullmatch(r'from-(.+)', name)
+    if match and color(match.group(1)):
+        return '{}', (f'--tw-gradient-from:{color(match.group(1))};--tw-gradient-to:{transparent(match.group(1))};'
+                      '--tw-gradient-stops:var(--tw-gradient-from),var(--tw-gradient-to)')
+
+    match = re.fullmatch(r'via-(.+)', name)
+    if match and color(match.group(1)):
+        return '{}', (f'--tw-gradient-to:{transparent(match.group(1))};'
+                      f'--tw-gradient-stops:var(--tw-gradient-from),{color(match.group(1))},var(--tw-gradient-to)')
+
+    match = re.fullmatch(r'to-(.+)', name)
+    if match and color(match.group(1)):
+        return '{}', f'--tw-gradient-to:{color(match.group(1))}'
+
+    match = re.fullmatch(r'border(?:-([trblxy]))?(?:-(\d+))?', name)
+    if match:
+        width = f'{match.group(2)}px' if match.group(2) else '1px'
+        return '{}', ';'.join(f'{prop}:{width}' for prop in BORDER_SIDES[match.group(1) or ''])
+
+    match = re.fullmatch(r'border-(.+)', name)
+    if match and color(match.group(1)):
+        return '{}', f'border-color:{color(match.group(1))}'
+
+    match = re.fullmatch(r'rounded(?:-(.+))?', name)
+    if match and (match.group(1) or '') in RADII:
+        return '{}', f'border-radius:{RADII[match.group(1) or ""]}'
+
+    match = re.fullmatch(r'grid-cols-(\d+)', name)
+    if match:
+        return '{}', f'grid-template-columns:repeat({match.group(1)},minmax(0,1fr))'
+
+    match = re.fullmatch(r'col-span-(\d+)', name)
+    if match:
+        return '{}', f'grid-column:span {match.group(1)}/span {match.group(1)}'
+
+    match = re.fullmatch(r'z-(\d+)', name)
+    if match:
+        return '{}', f'z-index:{match.group(1)}'
+
+    match = re.fullmatch(r'opacity-(\d+)', name)
+    if match and int(match.group(1)) <= 100:
+        return '{}', f'opacity:{int(match.group(1)) / 100:g}'
+
+    match = re.fullmatch(r'scale-(\d+)', name)
+    if match:
+        scale = f'{int(match.group(1)) / 100:g}'
+        return '{}', f'--tw-scale-x:{scale};--tw-scale-y:{scale};{TRANSFORM}'
+
+    match = re.fullmatch(r'shadow(?:-(.+))?', name)
+    if match and (match.group(1) or '') in SHADOWS:
+        shape, default = SHADOWS[match.group(1) or '']
+        return '{}', (f'--tw-shadow:{shape.format(c=default)};'
+                      f'--tw-shadow-colored:{shape.format(c="var(--tw-shadow-color)")};{BOX_SHADOW}')
+    if match and color(match.group(1)):
+        return '{}', f'--tw-shadow-color:{color(match.group(1))};--tw-shadow:var(--tw-shadow-colored)'
+
+    match = re.fullmatch(r'ring(?:-(\d+))?', name)
+    if match:
+        width = f'{match.group(1) or 3}px'
+        return '{}', ('--tw-ring-offset-shadow:var(--tw-ring-inset,) 0 0 0 var(--tw-ring-offset-width,0px) var(--tw-ring-offset-color,#fff);'
+                      f'--tw-ring-shadow:var(--tw-ring-inset,) 0 0 0 calc({width} + var(--tw-ring-offset-width,0px)) '
+                      'var(--tw-ring-color,rgb(59 130 246 / 0.5));' + BOX_SHADOW)
+
+    match = re.fullmatch(r'ring-(.+)', name)
+    if match and color(match.group(1)):
+        return '{}', f'--tw-ring-color:{color(match.group(1))}'
+
+    match = re.fullmatch(r'placeholder-(.+)', name)
+    if match and color(match.group(1)):
+        return '{}::placeholder', f'color:{color(match.group(1))}'
+
+    match = re.fullmatch(r'backdrop-blur(?:-(.+))?', name)
+    if match and (match.group(1) or '') in BLURS:
+        blur = f'blur({BLURS[match.group(1) or ""]})'
+        return '{}', f'-webkit-backdrop-filter:{blur};backdrop-filter:{blur}'
+
+    return None
+
+
+def escape_class(name):
+    return re.sub(r'([^A-Za-z0-9_-])', r'\\\1', name)
+
+
+def generate_rules(candidates):
+    # Returns {media min-width or None: [rule, ...]} in Tailwind's order:
+    # plain utilities, then pseudo-class variants, then each breakpoint.
+    buckets = {}
+    for candidate in sorted(candidates):
+        *variants, name = candidate.split(':')
+        screen = None
+        pseudo = ''
+        valid = True
+        for variant in variants:
+            if variant in SCREENS and screen is None:
+                screen = SCREENS[variant]
+            elif variant in PSEUDO_VARIANTS:
+                pseudo += PSEUDO_VARIANTS[variant]
+            else:
+                valid = False
+        generated = utility(name) if valid else None
+        if generated is None:
+            continue
+        template, declarations = generated
+        selector = template.format('.' + escape_class(candidate) + pseudo)
+        buckets.setdefault((screen or 0, bool(pseudo)), []).append(f'{selector}{{{declarations}}}')
+        if name == 'container':
+            for width in SCREENS.values():
+                if screen is None or width >= screen:
+                    buckets.setdefault((width, False), []).append(
+                        f'.{escape_class(candidate)}{{max-width:{width}px}}')
+
+    ordered = {}
+    for (screen, has_pseudo) in sorted(buckets):
+        ordered.setdefault(screen or None, []).extend(buckets[(screen, has_pseudo)])
+    return ordered
+
+
+def render_rules(rules):
+    css = []
+    for screen, block in rules.items():
+        body = ''.join(block)
+        css.append(f'@media (min-width:{screen}px){{{body}}}' if screen else body)
+    return ''.join(css)
+
+
+def minify(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def _content_block(source):
+    start = source.find('{% block content %}')
+    return source[start:] if start != -1 else source
+
+
+def scan_templates():
+    candidates, critical = set(), set()
+    paths = glob.glob(os.path.join(TEMPLATE_DIR, '**', '*.html'), recursive=True)
+    paths += glob.glob(os.path.join(STATIC_DIR, 'js', '*.js'))
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        tokens = {token.strip('.:') for token in CANDIDATE_RE.findall(source)}
+        candidates.update(tokens)
+        rel_path = os.path.relpath(path, TEMPLATE_DIR).replace(os.sep, '/')
+        if rel_path == 'base.html':
+            critical.update(tokens)
+        elif rel_path.startswith(('public/', 'errors/')):
+            if CRITICAL_MARKER in source:
+                fold = source.split(CRITICAL_MARKER, 1)[0]
+            else:
+                fold = _content_block(source)[:CRITICAL_CHARS]
+            critical.update(token.strip('.:') for token in CANDIDATE_RE.findall(fold))
+    return candidates, critical
+
+
+def scan_database_icons():
+    # SocialLink.icon_class values live in the database, not the templates.
+    from app import create_app
+    from models import SocialLink
+    app = create_app()
+    with app.app_context():
+        return {token for (icon_class,) in SocialLink.query.with_entities(SocialLink.icon_class)
+                for token in (icon_class or '').split()}
+
+
+FONT_STYLES = (
+    # (prefix classes, webfont base name, font-family, font-weight)
+    (('fas', 'fa-solid', 'fa'), 'fa-solid-900', 'Font Awesome 6 Free', 900),
+    (('far', 'fa-regular'), 'fa-regular-400', 'Font Awesome 6 Free', 400),
+    (('fab', 'fa-brands'), 'fa-brands-400', 'Font Awesome 6 Brands', 400),
+)
+FA_ICON_BASE = ('display:inline-block;font-style:normal;font-variant:normal;line-height:1;'
+                'text-rendering:auto;-webkit-font-smoothing:antialiased;-moz-osx-font-smoothing:grayscale')
+
+
+def font_awesome_codepoints(fa_dir):
+    for name in ('all.min.css', 'all.css'):
+        path = os.path.join(fa_dir, 'css', name)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                css = f.read()
+            break
+    else:
+        return {}
+    codepoints = {}
+    for selectors, body in re.findall(r'([^{}]+)\{([^{}]*)\}', css):
+        match = re.search(r'(?:content|--fa)\s*:\s*"\\([0-9a-fA-F]+)"', body)
+        if not match:
+            continue
+        for selector in selectors.split(','):
+            icon = re.fullmatch(r'\s*\.fa-([a-z0-9-]+)(?::{1,2}before)?\s*', selector)
+            if icon:
+                codepoints[icon.group(1)] = int(match.group(1), 16)
+    return codepoints
+
+
+def build_icons(fa_dir, candidates):
+    # Returns the icon CSS with subsetted fonts written to static/dist/fonts,
+    # or None when Font Awesome or fontTools is not available.
+    try:
+        from fontTools import subset
+    except ImportError:
+        print("Note: install 'fonttools' to self-host a subsetted icon font")
+        return None
+    codepoints = font_awesome_codepoints(fa_dir) if fa_dir else {}
+    if not codepoints:
+        print("Note: Font Awesome not found (set FONTAWESOME_DIR); icons stay on the CDN")
+        return None
+
+    names = {token[3:] for token in candidates if token.startswith('fa-')}
+    names.update(COMMON_BRAND_ICONS)
+    used = {name: codepoints[name] for name in sorted(names) if name in codepoints}
+
+    # fontTools needs brotli to write WOFF2.
+    flavor = 'woff2' if importlib.util.find_spec('brotli') is not None else 'woff'
+
+    from assets import file_hash, fingerprinted
+    font_dir = os.path.join(DIST_DIR, 'fonts')
+    os.makedirs(font_dir, exist_ok=True)
+    for old in glob.glob(os.path.join(font_dir, 'fa-*')):
+        os.remove(old)
+
+    css = []
+    for classes, font, family, weight in FONT_STYLES:
+        source = next((os.path.join(fa_dir, 'webfonts', f'{font}.{ext}') for ext in ('woff2', 'ttf')
+                       if os.path.exists(os.path.join(fa_dir, 'webfonts', f'{font}.{ext}'))), None)
+        if source is None:
+            continue
+        options = subset.Options()
+        options.flavor = flavor
+        options.layout_features = ['*']
+        options.notdef_outline = True
+        subset_font = subset.load_font(source, options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=used.values())
+        subsetter.subset(subset_font)
+        target = os.path.join(font_dir, f'{font}.{flavor}')
+        subset.save_font(subset_font, target, options)
+        hashed = fingerprinted(f'{font}.{flavor}', file_hash(target))
+        os.replace(target, os.path.join(font_dir, hashed))
+        css.append(f'@font-face{{font-family:"{family}";font-style:normal;font-weight:{weight};'
+                   f'font-display:block;src:url(fonts/{hashed}) format("{flavor}")}}')
+        selector = ','.join(f'.{cls}' for cls in classes)
+        css.append(f'{selector}{{{FA_ICON_BASE};font-family:"{family}";font-weight:{weight}}}')
+
+    css.extend(f'.fa-{name}::before{{content:"\\{codepoint:x}"}}' for name, codepoint in used.items())
+    return ''.join(css)
+
+
+def build(fa_dir=None, use_database=True):
+    candidates, critical = scan_templates()
+    if use_database:
+        try:
+            candidates.update(scan_database_icons())
+        except Exception as exc:
+            print(f"Note: could not read social link icons from the database ({exc})")
+
+    with open(os.path.join(STATIC_DIR, 'css', 'style.css'), encoding='utf-8') as f:
+        custom = minify(f.read())
+    # @import must precede every other rule in the bundle.
+    imports = ''.join(re.findall(r'@import[^;]+;', custom))
+    custom = re.sub(r'@import[^;]+;', '', custom)
+
+    icons = build_icons(fa_dir, candidates)
+    utilities = render_rules(generate_rules(candidates))
+    bundle = imports + PREFLIGHT + utilities + (icons or '') + custom
+    critical_css = PREFLIGHT + render_rules(generate_rules(critical))
+
+    os.makedirs(DIST_DIR, exist_ok=True)
+    with open(os.path.join(DIST_DIR, 'app.css'), 'w', encoding='utf-8') as f:
+        f.write(bundle)
+    with open(os.path.join(DIST_DIR, 'critical.css'), 'w', encoding='utf-8') as f:
+        f.write(critical_css)
+    with open(BUNDLE_FILE, 'w') as f:
+        json.dump({'css': 'dist/app.css', 'critical': 'dist/critical.css', 'icons': icons is not None}, f, indent=2)
+    return len(bundle), len(critical_css), icons is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the self-hosted stylesheet bundle into static/dist.')
+    parser.add_argument('--fontawesome', default=os.environ.get('FONTAWESOME_DIR'),
+                        help='Font Awesome Free 6 distribution with css/ and webfonts/ (default: $FONTAWESOME_DIR)')
+    parser.add_argument('--no-db', action='store_true',
+                        help='do not read social link icon classes from the database')
+    args = parser.parse_args()
+
+    use_database = not args.no_db and bool(os.environ.get('DATABASE_URL'))
+    bundle_size, critical_size, icons = build(args.fontawesome, use_database)
+    print(f"Wrote static/dist/app.css ({bundle_size} bytes) and critical.css ({critical_size} bytes)")
+    print("Icons: self-hosted subset" if icons else "Icons: Font Awesome CDN")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
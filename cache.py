@@ -0,0 +1,258 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from functools import wraps
+from select import select as wait_readable
+from threading import Lock, Thread
+from flask import current_app, g, request, make_response
+from sqlalchemy import event, select, text, update
+from sqlalchemy.orm import Session
+from models import db, ContentVersion
+
+# Tables whose rows are rendered on public pages. Any flush touching one of
+# them bumps both its own counter and the global 'content' counter.
+CONTENT_TABLES = ('projects', 'skills', 'experiences', 'testimonials', 'site_settings', 'social_links')
+GLOBAL_VERSION = 'content'
+NOTIFY_CHANNEL = 'content_version'
+
+logger = logging.getLogger(__name__)
+
+_version_lock = Lock()
+_version_memo = {}
+# Bumped by every clear, so a version read before a clear is not memoized after it.
+_memo_generation = [0]
+_listener = {'pid': None, 'alive': False, 'max_age': 60}
+_change_callbacks = []
+
+
+def _touched_tables(session):
+    tables = set()
+    for obj in session.new | session.deleted:
+        tables.add(getattr(obj, '__tablename__', None))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            tables.add(getattr(obj, '__tablename__', None))
+    return tables.intersection(CONTENT_TABLES)
+
+
+def bump_content_version(session, tables):
+    names = [GLOBAL_VERSION] + sorted(set(tables))
+    result = session.execute(
+        update(ContentVersion)
+        .where(ContentVersion.name.in_(names))
+        .values(version=ContentVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount < len(names):
+        existing = set(session.execute(
+            select(ContentVersion.name).where(ContentVersion.name.in_(names))
+        ).scalars())
+        for name in names:
+            if name not in existing:
+                session.execute(ContentVersion.__table__.insert().values(name=name, version=1))
+    if session.get_bind().dialect.name == 'postgresql':
+        # Delivered to the other workers' listeners only once this commits.
+        session.execute(text('SELECT pg_notify(:channel, :names)'),
+                        {'channel': NOTIFY_CHANNEL, 'names': ','.join(names)})
+    session.info['content_bumped'] = True
+    session.info.setdefault('content_tables', set()).update(tables)
+
+
+def read_content_version(session, name=GLOBAL_VERSION):
+    # Straight from the database, as seen by this session's transaction.
+    return session.execute(
+        select(ContentVersion.version).where(ContentVersion.name == name)
+    ).scalar() or 0
+
+
+def get_content_version(name=GLOBAL_VERSION, ttl=0):
+    _ensure_listener()
+    now = time.monotonic()
+    with _version_lock:
+        generation = _memo_generation[0]
+        if ttl or _listener['alive']:
+            memo = _version_memo.get(name)
+            if memo and memo[1] > now:
+                return memo[0]
+    version = read_content_version(db.session, name)
+    # While a NOTIFY listener is running the memo is cleared on every bump, so
+    # it can be trusted for longer than the polling TTL.
+    max_age = max(ttl, _listener['max_age']) if _listener['alive'] else ttl
+    with _version_lock:
+        if _memo_generation[0] == generation:
+            _version_memo[name] = (version, now + max_age)
+    return version
+
+
+def _forget_versions():
+    with _version_lock:
+        _memo_generation[0] += 1
+        _version_memo.clear()
+
+
+def _listen(engine):
+    while True:
+        try:
+            connection = engine.raw_connection()
+            connection.detach()
+            dbapi_connection = connection.driver_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+            _listener['alive'] = True
+            while True:
+                if wait_readable([dbapi_connection], [], [], 30)[0]:
+                    dbapi_connection.poll()
+                    if dbapi_connection.notifies:
+                        dbapi_connection.notifies.clear()
+                        _forget_versions()
+        except Exception:
+            logger.exception('Content version listener failed, falling back to polling')
+            _listener['alive'] = False
+            _forget_versions()
+            time.sleep(5)
+
+
+def _ensure_listener():
+    # Threads do not survive a fork, so each gunicorn worker starts its own.
+    if _listener['pid'] == os.getpid() or not _listener.get('enabled'):
+        return
+    _listener['pid'] = os.getpid()
+    _listener['alive'] = False
+    engine = db.engine
+    if engine.dialect.name != 'postgresql':
+        return
+    Thread(target=_listen, args=(engine,), name='content-version-listener', daemon=True).start()
+
+
+# Per-process cache of a near-static query, reloaded when the content version
+# of its table moves.
+class CachedLookup:
+    def __init__(self, table, loader):
+        self.table = table
+        self.loader = loader
+        self._lock = Lock()
+        self._version = None
+        self._value = None
+
+    def get(self):
+        version = get_content_version(self.table, ttl=current_app.config.get('CONTENT_VERSION_TTL', 0))
+        with self._lock:
+            if self._version == version:
+                return self._value
+        value = self.loader()
+        with self._lock:
+            self._version = version
+            self._value = value
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._value = None
+
+
+def _before_flush(session, flush_context, instances):
+    tables = _touched_tables(session)
+    if tables:
+        bump_content_version(session, tables)
+
+
+def on_content_change(callback):
+    # callback(tables) runs in the committing process after a content commit.
+    _change_callbacks.append(callback)
+    return callback
+
+
+def _after_commit(session):
+    if session.info.pop('content_bumped', False):
+        # The committing worker sees its own edit immediately, even with a TTL.
+        _forget_versions()
+        tables = session.info.pop('content_tables', set())
+        for callback in _change_callbacks:
+            try:
+                callback(tables)
+            except Exception:
+                logger.exception('Content change callback %r failed', callback)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    session.info.pop('content_bumped', None)
+    session.info.pop('content_tables', None)
+
+
+class PageCache:
+    def __init__(self, app=None):
+        self.max_entries = 64
+        self.version_ttl = 0
+        self.enabled = True
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PAGE_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('PAGE_CACHE_SIZE', 64)
+        self.version_ttl = app.config.get('CONTENT_VERSION_TTL', 0)
+        _listener['enabled'] = app.config.get('CONTENT_VERSION_NOTIFY', True)
+        _listener['max_age'] = app.config.get('CONTENT_VERSION_NOTIFY_MAX_AGE', 60)
+        if not event.contains(Session, 'before_flush', _before_flush):
+            event.listen(Session, 'before_flush', _before_flush)
+            event.listen(Session, 'after_commit', _after_commit)
+            event.listen(Session, 'after_soft_rollback', _after_soft_rollback)
+        app.extensions['page_cache'] = self
+
+    def get(self, key, version):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, version, entry):
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def cached(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or request.method != 'GET':
+                return view(*args, **kwargs)
+
+            version = get_content_version(ttl=self.version_ttl)
+            g.content_version = version
+            key = request.full_path
+            entry = self.get(key, version)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                entry = (response.get_data(), response.mimetype)
+                self.set(key, version, entry)
+
+            body, mimetype = entry
+            response = make_response(body)
+            response.mimetype = mimetype
+            response.headers['X-Content-Version'] = str(version)
+            return response
+        return wrapper
+
+
+page_cache = PageCache()
@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/xml', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson', 'application/xml',
+    'image/svg+xml',
+}
+
+# Payloads seen again (static files, cached pages) are compressed once at the
+# highest level; one-off responses use a level that costs little per request.
+CACHED_LEVELS = {'br': 11, 'gzip': 9}
+UNCACHED_LEVELS = {'br': 4, 'gzip': 6}
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+# Negotiates gzip or Brotli from Accept-Encoding for text responses. Bodies
+# of static files and of responses served from the page cache are memoized
+# by content hash, so each distinct payload is compressed once per worker.
+class Compressor:
+    def __init__(self, app=None):
+        self._lock = Lock()
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self.max_cache_bytes = 0
+        self.min_size = 0
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['compressor'] = self
+        self.enabled = app.config.get('COMPRESS_ENABLED', True)
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+        self.max_cache_bytes = app.config.get('COMPRESS_CACHE_BYTES', 16 * 1024 * 1024)
+        if self.enabled:
+            app.after_request(self.after_request)
+
+    def negotiate(self):
+        accept = request.accept_encodings
+        if brotli is not None and accept['br']:
+            return 'br'
+        if accept['gzip']:
+            return 'gzip'
+        return None
+
+    def after_request(self, response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+        if (
+            request.method == 'HEAD'
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or 'Content-Range' in response.headers
+            or (response.is_streamed and not response.direct_passthrough)
+        ):
+            return response
+        encoding = self.negotiate()
+        if encoding is None:
+            return response
+
+        cacheable = request.endpoint == 'static' or 'X-Content-Version' in response.headers
+        # send_file() responses wrap the open file; read it so it can be compressed.
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        if cacheable:
+            body = self._cached(data, encoding)
+        else:
+            body = compress(data, encoding, UNCACHED_LEVELS[encoding])
+        if len(body) >= len(data):
+            return response
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # The encoded body is a different byte sequence; a weak validator
+            # still lets If-None-Match from either representation match.
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _cached(self, data, encoding):
+        key = (hashlib.blake2b(data, digest_size=16).digest(), encoding)
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+                return body
+        body = compress(data, encoding, CACHED_LEVELS[encoding])
+        with self._lock:
+            if key not in self._cache and len(body) <= self.max_cache_bytes:
+                self._cache[key] = body
+                self._cache_bytes += len(body)
+                while self._cache_bytes > self.max_cache_bytes:
+                    old_key, old_body = self._cache.popitem(last=False)
+                    self._cache_bytes -= len(old_body)
+        return body
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._cache), 'bytes': self._cache_bytes, 'max_bytes': self.max_cache_bytes}
+
+
+compressor = Compressor()
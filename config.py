@@ -11,9 +11,106 @@ class Config:
         raise ValueError('DATABASE_URL environment variable must be set')
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-    }
+    # Extra engine options; pool settings come from the DB_POOL_* values
+    # below (see db_pool.py).
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    
+    # Pool profile: 'default', 'small' (many sync workers), 'large' (gthread
+    # workers) or 'pgbouncer' (transaction pooling: no prepared statements,
+    # no LISTEN). DB_POOL_SIZE, DB_MAX_OVERFLOW and DB_POOL_TIMEOUT override it.
+    # Instead of pinging on every checkout, a background thread per worker
+    # checks the database every DB_LIVENESS_INTERVAL seconds and resets the
+    # pool when it is unreachable.
+    DB_POOL_PROFILE = os.environ.get('DB_POOL_PROFILE', 'default').lower()
+    DB_POOL_SIZE = int(os.environ['DB_POOL_SIZE']) if os.environ.get('DB_POOL_SIZE') else None
+    DB_MAX_OVERFLOW = int(os.environ['DB_MAX_OVERFLOW']) if os.environ.get('DB_MAX_OVERFLOW') else None
+    DB_POOL_TIMEOUT = float(os.environ['DB_POOL_TIMEOUT']) if os.environ.get('DB_POOL_TIMEOUT') else None
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 300))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'false').lower() in ('true', '1', 'yes')
+    DB_LIVENESS_INTERVAL = float(os.environ.get('DB_LIVENESS_INTERVAL', 30))
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     WTF_CSRF_ENABLED = True
+    
+    ADMIN_MESSAGES_PER_PAGE = int(os.environ.get('ADMIN_MESSAGES_PER_PAGE', 50))
+    SEARCH_RESULTS_PER_PAGE = int(os.environ.get('SEARCH_RESULTS_PER_PAGE', 10))
+    PROJECTS_PER_PAGE = int(os.environ.get('PROJECTS_PER_PAGE', 12))
+    
+    # Serve static files under content-hashed URLs with immutable caching.
+    ASSET_FINGERPRINTING = os.environ.get('ASSET_FINGERPRINTING', 'true').lower() in ('true', '1', 'yes')
+    
+    # Prometheus metrics at /metrics. Each worker writes its values to a file
+    # in METRICS_DIR every FLUSH_INTERVAL seconds; a scrape sums the files.
+    # Only enabled with METRICS_TOKEN set; scrapes need 'Authorization: Bearer <token>'.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1.0))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # SQL profiling. Statements slower than SQL_SLOW_QUERY_MS are logged (to
+    # SQL_SLOW_QUERY_LOG if set). Profiled requests log every statement with
+    # the code that issued it and flag shapes repeated SQL_REPEAT_THRESHOLD
+    # times (N+1). Admins can profile one request with 'X-Profile-SQL: 1'.
+    SQL_PROFILER_ENABLED = os.environ.get('SQL_PROFILER_ENABLED', 'false').lower() in ('true', '1', 'yes')
+    SQL_PROFILER_HEADER = os.environ.get('SQL_PROFILER_HEADER', 'true').lower() in ('true', '1', 'yes')
+    SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 100))
+    SQL_SLOW_QUERY_LOG = os.environ.get('SQL_SLOW_QUERY_LOG')
+    SQL_REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD', 5))
+    SQL_SERVER_TIMING = os.environ.get('SQL_SERVER_TIMING', 'false').lower() in ('true', '1', 'yes')
+    
+    # gzip/Brotli response compression. Compressed static files and cached
+    # pages are kept per worker up to COMPRESS_CACHE_BYTES.
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_CACHE_BYTES = int(os.environ.get('COMPRESS_CACHE_BYTES', 16 * 1024 * 1024))
+    
+    # Hand CV downloads to the front-end server: 'x-accel-redirect' (nginx,
+    # internal location at CV_ACCEL_PREFIX aliased to static/) or
+    # 'x-sendfile' (Apache, lighttpd). Empty streams the file from Python.
+    CV_SENDFILE = os.environ.get('CV_SENDFILE', '').lower()
+    CV_ACCEL_PREFIX = os.environ.get('CV_ACCEL_PREFIX', '/internal-static/')
+    
+    # Compiled templates are cached as bytecode ('filesystem', 'memcached' or
+    # 'none') and every template is compiled when the app is created.
+    JINJA_BYTECODE_CACHE = os.environ.get('JINJA_BYTECODE_CACHE', 'filesystem').lower()
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+    JINJA_BYTECODE_CACHE_SERVER = os.environ.get('JINJA_BYTECODE_CACHE_SERVER', 'localhost:11211')
+    JINJA_WARMUP = os.environ.get('JINJA_WARMUP', 'true').lower() in ('true', '1', 'yes')
+    
+    # Threads per worker that render resized variants of uploaded images.
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+    
+    # Contact form submissions are spooled to disk and inserted in batches by
+    # a background thread; when MAX_SIZE submissions are waiting the form
+    # answers 503 until the flusher catches up.
+    CONTACT_QUEUE_ENABLED = os.environ.get('CONTACT_QUEUE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    CONTACT_QUEUE_MAX_SIZE = int(os.environ.get('CONTACT_QUEUE_MAX_SIZE', 1000))
+    CONTACT_QUEUE_BATCH_SIZE = int(os.environ.get('CONTACT_QUEUE_BATCH_SIZE', 200))
+    CONTACT_QUEUE_FLUSH_INTERVAL = float(os.environ.get('CONTACT_QUEUE_FLUSH_INTERVAL', 1.0))
+    CONTACT_QUEUE_FSYNC = os.environ.get('CONTACT_QUEUE_FSYNC', 'true').lower() in ('true', '1', 'yes')
+    CONTACT_QUEUE_SPOOL_DIR = os.environ.get('CONTACT_QUEUE_SPOOL_DIR')
+    
+    # Rendered public pages are cached per worker and keyed by the content
+    # version that admin writes bump. A non-zero TTL lets workers reuse the
+    # last version they read for that many seconds instead of reading it per
+    # request, at the cost of serving a page that stale after another
+    # worker's edit.
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', 64))
+    CONTENT_VERSION_TTL = float(os.environ.get('CONTENT_VERSION_TTL', 0))
+    
+    # On PostgreSQL each worker also LISTENs for version bumps and can then
+    # trust its cached versions for up to NOTIFY_MAX_AGE seconds. SQLite and
+    # listener failures fall back to the TTL polling above.
+    CONTENT_VERSION_NOTIFY = os.environ.get('CONTENT_VERSION_NOTIFY', 'true').lower() in ('true', '1', 'yes')
+    CONTENT_VERSION_NOTIFY_MAX_AGE = float(os.environ.get('CONTENT_VERSION_NOTIFY_MAX_AGE', 60))
+    
+    # Read-only JSON API under /api/v1. Responses carry an ETag from the
+    # content version; browsers keep them MAX_AGE seconds, CDNs
+    # SHARED_MAX_AGE. CORS_ORIGIN (empty to disable) lets other sites fetch it.
+    API_MAX_AGE = int(os.environ.get('API_MAX_AGE', 60))
+    API_SHARED_MAX_AGE = int(os.environ.get('API_SHARED_MAX_AGE', 300))
+    API_CORS_ORIGIN = os.environ.get('API_CORS_ORIGIN', '*')
+    
+    # When set, every admin save re-exports the affected public pages into
+    # this directory (see freeze.py).
+    STATIC_EXPORT_DIR = os.environ.get('STATIC_EXPORT_DIR')
@@ -0,0 +1,249 @@
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from sqlalchemy import insert
+from models import db, ContactMessage
+from counters import adjust_counters, UNREAD_MESSAGES
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    pass
+
+
+# Buffers validated contact form submissions and writes them in batches from
+# a background thread. Each submission is appended to a per-process spool file
+# before it is acknowledged, so a crash loses nothing: the next worker to start
+# claims spool files whose owner is gone and inserts them. Owners are named by
+# a random id rather than the pid, which a restarted container hands out
+# again, and prove they are alive by holding an flock on <owner>.lock.
+class ContactQueue:
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+        self._owner = None
+        self._owner_lock = None
+        self._started = None
+        self._pending = []
+        self._in_flight = []
+        self._segment = None
+        self._segment_path = None
+        self._segment_seq = 0
+        self._stats = {
+            'enqueued': 0,
+            'rejected': 0,
+            'flushed': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'last_flush_seconds': 0.0,
+            'total_flush_seconds': 0.0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('CONTACT_QUEUE_ENABLED', True)
+        self.max_size = app.config.get('CONTACT_QUEUE_MAX_SIZE', 1000)
+        self.batch_size = app.config.get('CONTACT_QUEUE_BATCH_SIZE', 200)
+        self.flush_interval = app.config.get('CONTACT_QUEUE_FLUSH_INTERVAL', 1.0)
+        self.fsync = app.config.get('CONTACT_QUEUE_FSYNC', True)
+        self.spool_dir = app.config.get('CONTACT_QUEUE_SPOOL_DIR') or os.path.join(app.instance_path, 'contact_spool')
+        app.extensions['contact_queue'] = self
+
+    @property
+    def depth(self):
+        return len(self._pending) + sum(len(rows) for rows, path in self._in_flight)
+
+    def enqueue(self, name, email, subject, message):
+        self.start()
+        row = {
+            'name': name,
+            'email': email,
+            'subject': subject,
+            'message': message,
+            'date_received': datetime.utcnow().isoformat(),
+        }
+        with self._lock:
+            if self.depth >= self.max_size:
+                self._stats['rejected'] += 1
+                raise QueueFull()
+            self._spool(row)
+            self._pending.append(row)
+            self._stats['enqueued'] += 1
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['depth'] = self.depth
+            stats['max_size'] = self.max_size
+        stats['avg_flush_seconds'] = stats['total_flush_seconds'] / stats['flushes'] if stats['flushes'] else 0.0
+        return stats
+
+    def flush(self):
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            if self._pending:
+                self._in_flight.append((self._pending, self._close_segment()))
+                self._pending = []
+            batches = list(self._in_flight)
+
+        for rows, path in batches:
+            start = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    for offset in range(0, len(rows), self.batch_size):
+                        self._insert(rows[offset:offset + self.batch_size])
+                    db.session.commit()
+            except Exception:
+                # Keep the batch (and its spool file) for the next attempt.
+                logger.exception('Failed to flush %d queued contact messages', len(rows))
+                with self.app.app_context():
+                    db.session.rollback()
+                with self._lock:
+                    self._stats['failed_flushes'] += 1
+                return
+            elapsed = time.perf_counter() - start
+            if path:
+                os.remove(path)
+            with self._lock:
+                self._in_flight.remove((rows, path))
+                self._stats['flushed'] += len(rows)
+                self._stats['flushes'] += 1
+                self._stats['last_flush_seconds'] = elapsed
+                self._stats['total_flush_seconds'] += elapsed
+
+    def _insert(self, rows):
+        values = [dict(row, date_received=datetime.fromisoformat(row['date_received']), status='unread') for row in rows]
+        db.session.execute(insert(ContactMessage), values)
+        # executemany bypasses the ORM flush hooks that maintain the counters.
+        adjust_counters(db.session, {'contact_messages': len(values), UNREAD_MESSAGES: len(values)})
+
+    def _spool(self, row):
+        if self._segment is None:
+            self._segment_seq += 1
+            self._segment_path = os.path.join(self.spool_dir, f'{self._owner}-{self._segment_seq}.ndjson')
+            self._segment = open(self._segment_path, 'a', encoding='utf-8')
+        self._segment.write(json.dumps(row) + '\n')
+        self._segment.flush()
+        if self.fsync:
+            os.fsync(self._segment.fileno())
+
+    def _close_segment(self):
+        path = self._segment_path
+        if self._segment is not None:
+            self._segment.close()
+        self._segment = None
+        self._segment_path = None
+        return path
+
+    def _recover(self):
+        # Claim spool files whose owner no longer holds its lock.
+        owners = {os.path.basename(path).split('-', 1)[0]
+                  for path in glob.glob(os.path.join(self.spool_dir, '*.ndjson'))}
+        owners.update(os.path.basename(path)[:-len('.lock')]
+                      for path in glob.glob(os.path.join(self.spool_dir, '*.lock')))
+        owners.discard(self._owner)
+        for owner in sorted(owners):
+            lock_path = os.path.join(self.spool_dir, f'{owner}.lock')
+            lock = _take_lock(lock_path)
+            if lock is False:
+                continue  # Still running.
+            # Listed again under the lock, so every segment is claimed before
+            # the lock file goes away.
+            for path in sorted(glob.glob(os.path.join(self.spool_dir, f'{owner}-*.ndjson'))):
+                self._claim(path, unowned=lock is None)
+            if lock:
+                os.unlink(lock_path)
+                lock.close()
+
+    def _claim(self, path, unowned=False):
+        claimed = os.path.join(self.spool_dir, f'{self._owner}-recovered-{os.path.basename(path)}')
+        try:
+            if unowned and os.path.getmtime(path) >= self._started:
+                # Without a lock file only spool files from before this
+                # process started (left by versions without owner locks)
+                # are certainly abandoned.
+                return
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return  # Another worker claimed it first.
+        with open(claimed, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        logger.info('Recovered %d queued contact messages from %s', len(rows), path)
+        with self._lock:
+            self._in_flight.append((rows, claimed))
+
+    def start(self):
+        # Called by each gunicorn worker once it has loaded the app, and on
+        # the first enqueue otherwise.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._started = time.time()
+            if self._owner_lock is not None:
+                # Inherited across a fork: the parent still holds the lock.
+                self._owner_lock.close()
+            self._owner = uuid.uuid4().hex
+            self._pending = []
+            self._in_flight = []
+            self._segment = None
+            self._segment_path = None
+            os.makedirs(self.spool_dir, exist_ok=True)
+            # Locked before it appears under its real name, so every
+            # <owner>.lock that _recover() can open is already held.
+            lock_path = os.path.join(self.spool_dir, f'{self._owner}.lock')
+            self._owner_lock = open(f'{lock_path}.tmp', 'w')
+            fcntl.flock(self._owner_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.rename(f'{lock_path}.tmp', lock_path)
+        self._recover()
+        threading.Thread(target=self._run, name='contact-queue-flusher', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Contact queue flusher failed')
+
+
+def _take_lock(path):
+    # The lock file opened and flocked if its owner is gone, False if it is
+    # still held, None if there is no lock file (spool files from before
+    # owners took locks).
+    try:
+        lock = open(path, 'r+')
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return False
+    return lock
+
+
+contact_queue = ContactQueue()
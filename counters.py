@@ -0,0 +1,110 @@
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import Session
+from models import db, Project, Skill, Testimonial, Experience, ContactMessage, RecordCount
+
+# Row counts shown on the admin dashboard. They are kept in record_counts and
+# adjusted in the same transaction as every ORM insert/delete, so reading them
+# costs one small query regardless of table size.
+COUNTED_MODELS = {
+    'projects': Project,
+    'skills': Skill,
+    'testimonials': Testimonial,
+    'experiences': Experience,
+    'contact_messages': ContactMessage,
+}
+UNREAD_MESSAGES = 'contact_messages_unread'
+COUNTER_NAMES = tuple(COUNTED_MODELS) + (UNREAD_MESSAGES,)
+
+
+def _is_unread(status):
+    # New messages get the 'unread' column default on insert.
+    return status in (None, 'unread')
+
+
+def _flush_deltas(session):
+    deltas = {}
+    for obj, sign in [(obj, 1) for obj in session.new] + [(obj, -1) for obj in session.deleted]:
+        name = getattr(obj, '__tablename__', None)
+        if name not in COUNTED_MODELS:
+            continue
+        deltas[name] = deltas.get(name, 0) + sign
+        if isinstance(obj, ContactMessage):
+            if sign > 0 and _is_unread(obj.status):
+                deltas[UNREAD_MESSAGES] = deltas.get(UNREAD_MESSAGES, 0) + 1
+            elif sign < 0 and _committed_status(obj) == 'unread':
+                deltas[UNREAD_MESSAGES] = deltas.get(UNREAD_MESSAGES, 0) - 1
+
+    for obj in session.dirty:
+        if not isinstance(obj, ContactMessage):
+            continue
+        history = inspect(obj).attrs.status.history
+        if not history.has_changes():
+            continue
+        was_unread = bool(history.deleted) and history.deleted[0] == 'unread'
+        is_unread = bool(history.added) and history.added[0] == 'unread'
+        if was_unread != is_unread:
+            deltas[UNREAD_MESSAGES] = deltas.get(UNREAD_MESSAGES, 0) + (1 if is_unread else -1)
+    return deltas
+
+
+def _committed_status(message):
+    history = inspect(message).attrs.status.history
+    if history.deleted:
+        return history.deleted[0]
+    return message.status
+
+
+def adjust_counters(session, deltas):
+    # Also used by set-based statements that bypass the ORM flush.
+    for name, delta in deltas.items():
+        if delta:
+            session.execute(
+                update(RecordCount)
+                .where(RecordCount.name == name)
+                .values(value=RecordCount.value + delta)
+                .execution_options(synchronize_session=False)
+            )
+
+
+def count_records():
+    # Fallback: every count in a single aggregate round trip.
+    columns = [
+        select(func.count()).select_from(model).scalar_subquery().label(name)
+        for name, model in COUNTED_MODELS.items()
+    ]
+    columns.append(
+        select(func.count()).select_from(ContactMessage)
+        .where(ContactMessage.status == 'unread')
+        .scalar_subquery().label(UNREAD_MESSAGES)
+    )
+    return dict(db.session.execute(select(*columns)).mappings().one())
+
+
+def rebuild_counters(commit=True):
+    counts = count_records()
+    RecordCount.query.filter(RecordCount.name.in_(COUNTER_NAMES)).delete(synchronize_session=False)
+    db.session.add_all(RecordCount(name=name, value=value) for name, value in counts.items())
+    if commit:
+        db.session.commit()
+    return counts
+
+
+def get_counters():
+    counts = dict(db.session.execute(
+        select(RecordCount.name, RecordCount.value).where(RecordCount.name.in_(COUNTER_NAMES))
+    ).all())
+    if len(counts) < len(COUNTER_NAMES):
+        # First use (or a database populated before record_counts existed).
+        counts = rebuild_counters()
+    return counts
+
+
+def _before_flush(session, flush_context, instances):
+    deltas = _flush_deltas(session)
+    if deltas:
+        adjust_counters(session, deltas)
+
+
+def init_counters(app):
+    if not event.contains(Session, 'before_flush', _before_flush):
+        event.listen(Session, 'before_flush', _before_flush)
@@ -0,0 +1,220 @@
+import argparse
+import gzip
+import io
+import json
+import sys
+from datetime import date, datetime
+from itertools import groupby
+from sqlalchemy import delete, func, insert, select, text
+from models import db
+from cache import bump_content_version, CONTENT_TABLES
+
+FORMAT = 'netsys-portfolio-export'
+FORMAT_VERSION = 1
+BATCH_SIZE = 1000
+COPY_BATCH_SIZE = 50000
+
+# Source-of-truth tables, parents first. Derived tables (counters, search
+# index, technology tags, content versions, snapshots) are rebuilt after an
+# import.
+EXPORT_TABLES = ('users', 'site_settings', 'social_links', 'projects', 'skills', 'experiences',
+                 'testimonials', 'contact_messages')
+
+
+def _copy_value(value):
+    # PostgreSQL COPY text format.
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def _copy(table, columns, rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(row.get(column)) for column in columns))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        quoted = ', '.join(f'"{column}"' for column in columns)
+        cursor.copy_expert(f'COPY "{table.name}" ({quoted}) FROM STDIN', buffer)
+    finally:
+        cursor.close()
+
+
+def bulk_insert(table, rows, commit=False):
+    # Inserts an iterable of row dicts in batches without ORM objects: COPY on
+    # PostgreSQL (psycopg2), executemany elsewhere. Every row must have the
+    # same keys, and Python-side column defaults are not applied under COPY.
+    # Only one batch is held in memory; commit=True commits after each batch.
+    # Returns the row count.
+    use_copy = db.session.get_bind().dialect.driver == 'psycopg2'
+    batch_size = COPY_BATCH_SIZE if use_copy else BATCH_SIZE
+    count = 0
+    batch = []
+
+    def flush():
+        if use_copy:
+            _copy(table, list(batch[0]), batch)
+        else:
+            db.session.execute(insert(table), batch)
+        if commit:
+            db.session.commit()
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            flush()
+            count += len(batch)
+            batch = []
+    if batch:
+        flush()
+        count += len(batch)
+    return count
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Cannot export {type(value).__name__}')
+
+
+def export_lines(tables=EXPORT_TABLES):
+    # NDJSON lines: a header, then one {"table", "row"} object per row. Rows
+    # are streamed with a server-side cursor, so memory use does not depend
+    # on table size.
+    yield json.dumps({'format': FORMAT, 'version': FORMAT_VERSION, 'tables': list(tables),
+                      'exported_at': datetime.utcnow().isoformat()}) + '\n'
+    for name in tables:
+        table = db.metadata.tables[name]
+        result = db.session.execute(
+            select(table).order_by(*table.primary_key.columns),
+            execution_options={'yield_per': BATCH_SIZE, 'stream_results': True},
+        )
+        for row in result.mappings():
+            yield json.dumps({'table': name, 'row': dict(row)}, default=_json_default) + '\n'
+
+
+def _row_converter(table):
+    converters = {}
+    for column in table.columns:
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            continue
+        if python_type is datetime:
+            converters[column.name] = datetime.fromisoformat
+        elif python_type is date:
+            converters[column.name] = date.fromisoformat
+    columns = [column.name for column in table.columns]
+
+    def convert(row):
+        values = {column: row.get(column) for column in columns}
+        for column, parse in converters.items():
+            if values[column] is not None:
+                values[column] = parse(values[column])
+        return values
+    return convert
+
+
+def _reset_sequences(tables):
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return  # SQLite continues from MAX(rowid) by itself.
+    for name in tables:
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM \"{name}\"), 0) + 1, false)"
+        ))
+
+
+def import_lines(lines, replace=False):
+    # Loads an export produced by export_lines() and rebuilds the derived
+    # tables from it in one transaction, holding no more than one batch in
+    # memory. Ids are kept, so the file must go into empty tables (or use
+    # replace). Returns {table: rows imported}.
+    from counters import rebuild_counters
+    from search import reindex_all
+    from tags import rebuild_tags
+
+    records = (json.loads(line) for line in lines if line.strip())
+    header = next(records, None)
+    if not header or header.get('format') != FORMAT or header.get('version') != FORMAT_VERSION:
+        raise ValueError('Not a portfolio export (or an unsupported version)')
+    tables = [name for name in header['tables'] if name in EXPORT_TABLES]
+
+    if replace:
+        for name in reversed(tables):
+            db.session.execute(delete(db.metadata.tables[name]))
+
+    counts = dict.fromkeys(tables, 0)
+    # Rows arrive grouped by table; groupby hands them over lazily.
+    for name, group in groupby(records, key=lambda record: record['table']):
+        if name not in counts:
+            raise ValueError(f'Unexpected table {name!r} in export')
+        table = db.metadata.tables[name]
+        convert = _row_converter(table)
+        counts[name] += bulk_insert(table, (convert(record['row']) for record in group))
+
+    _reset_sequences(tables)
+    # Set-based inserts bypass the flush hooks that maintain derived data.
+    # The version is bumped last, so the snapshot and page caches rebuilt
+    # for it already see the tags.
+    rebuild_counters(commit=False)
+    reindex_all(commit=False)
+    rebuild_tags(commit=False)
+    bump_content_version(db.session, CONTENT_TABLES)
+    db.session.commit()
+    return counts
+
+
+def _open(path, mode):
+    if path == '-':
+        return sys.stdout if mode == 'w' else sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export or import all portfolio content as NDJSON.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help='write every portfolio table to a file')
+    export_parser.add_argument('path', help="output file ('.gz' compresses, '-' is stdout)")
+    export_parser.add_argument('--no-users', action='store_true', help='leave out admin accounts')
+    import_parser = commands.add_parser('import', help='load a file written by export')
+    import_parser.add_argument('path', help="input file ('.gz' is decompressed, '-' is stdin)")
+    import_parser.add_argument('--replace', action='store_true',
+                               help='delete the existing rows of the exported tables first')
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        if args.command == 'export':
+            tables = [name for name in EXPORT_TABLES if not (args.no_users and name == 'users')]
+            out = _open(args.path, 'w')
+            try:
+                out.writelines(export_lines(tables))
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+            counts = {name: db.session.execute(select(func.count()).select_from(db.metadata.tables[name])).scalar()
+                      for name in tables}
+        else:
+            source = _open(args.path, 'r')
+            try:
+                counts = import_lines(source, replace=args.replace)
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+        summary = ', '.join(f'{name}: {count}' for name, count in counts.items())
+        print(f"{'Exported' if args.command == 'export' else 'Imported'} {summary}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+import logging
+import os
+import threading
+import time
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+from models import db
+from pool_profiles import POOL_PROFILES
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the checkout wait histogram.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+_stats_lock = threading.Lock()
+_stats = {
+    'wait_buckets': [0] * (len(WAIT_BUCKETS) + 1),
+    'wait_count': 0,
+    'wait_seconds': 0.0,
+    'timeouts': 0,
+    'liveness_checks': 0,
+    'liveness_failures': 0,
+    'last_liveness_check': None,
+}
+_monitor = {'pid': None}
+# Per thread: seconds the current checkout spent opening new connections.
+_checkout = threading.local()
+
+
+def _record_wait(seconds, timed_out=False):
+    index = next((i for i, bound in enumerate(WAIT_BUCKETS) if seconds <= bound), len(WAIT_BUCKETS))
+    with _stats_lock:
+        _stats['wait_buckets'][index] += 1
+        _stats['wait_count'] += 1
+        _stats['wait_seconds'] += seconds
+        if timed_out:
+            _stats['timeouts'] += 1
+
+
+class InstrumentedQueuePool(QueuePool):
+    # Records how long each checkout waited for a free connection. Time spent
+    # opening a new (e.g. overflow) connection is not waiting and is left out.
+    def _do_get(self):
+        if getattr(_checkout, 'connect_seconds', None) is not None:
+            # QueuePool._do_get retrying itself; the outer call records it.
+            return super()._do_get()
+        _checkout.connect_seconds = 0.0
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start - _checkout.connect_seconds
+            _checkout.connect_seconds = None
+            _record_wait(max(waited, 0.0), timed_out)
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            if getattr(_checkout, 'connect_seconds', None) is not None:
+                _checkout.connect_seconds += time.perf_counter() - start
+
+
+def engine_options(config):
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if not uri.startswith('postgresql'):
+        # SQLite keeps SQLAlchemy's default pool for its URL type.
+        options.setdefault('pool_pre_ping', True)
+        options.setdefault('pool_recycle', config.get('DB_POOL_RECYCLE', 300))
+        return options
+
+    profile = config.get('DB_POOL_PROFILE', 'default')
+    if profile not in POOL_PROFILES:
+        raise ValueError(f'Unknown DB_POOL_PROFILE {profile!r}; expected one of {", ".join(POOL_PROFILES)}')
+    options.update(POOL_PROFILES[profile])
+    for key, setting in (('pool_size', 'DB_POOL_SIZE'), ('max_overflow', 'DB_MAX_OVERFLOW'),
+                         ('pool_timeout', 'DB_POOL_TIMEOUT')):
+        if config.get(setting) is not None:
+            options[key] = config[setting]
+    options['pool_recycle'] = config.get('DB_POOL_RECYCLE', 300)
+    # Liveness is checked in the background instead of on every checkout.
+    options['pool_pre_ping'] = config.get('DB_POOL_PRE_PING', False)
+    options['poolclass'] = InstrumentedQueuePool
+
+    if profile == 'pgbouncer':
+        # Transaction pooling hands each transaction a different server
+        # connection, so nothing may outlive one: no prepared statements
+        # (psycopg 3 prepares after repeated use; psycopg2 never does).
+        if uri.startswith('postgresql+psycopg:'):
+            options.setdefault('connect_args', {})['prepare_threshold'] = None
+    return options
+
+
+def _check_liveness(app, interval):
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            engine = db.engine
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text('SELECT 1'))
+                failed = False
+            except Exception:
+                # Drop every pooled connection so requests reconnect instead
+                # of each discovering a dead socket (e.g. after a failover).
+                logger.warning('Database liveness check failed; resetting the connection pool', exc_info=True)
+                engine.dispose()
+                failed = True
+        with _stats_lock:
+            _stats['liveness_checks'] += 1
+            _stats['liveness_failures'] += failed
+            _stats['last_liveness_check'] = time.time()
+
+
+def _ensure_monitor(app):
+    if _monitor['pid'] == os.getpid():
+        return
+    _monitor['pid'] = os.getpid()
+    interval = app.config.get('DB_LIVENESS_INTERVAL', 30)
+    if interval > 0 and db.engine.dialect.name == 'postgresql':
+        threading.Thread(target=_check_liveness, args=(app, interval),
+                         name='db-liveness', daemon=True).start()
+
+
+def pool_stats():
+    # Live figures for this worker's pool; each gunicorn worker has its own.
+    pool = db.engine.pool
+    stats = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            timeout=pool.timeout(),
+        )
+    with _stats_lock:
+        stats.update(
+            waits=_stats['wait_count'],
+            wait_seconds_total=_stats['wait_seconds'],
+            wait_histogram={**{str(bound): count for bound, count in zip(WAIT_BUCKETS, _stats['wait_buckets'])},
+                            '+Inf': _stats['wait_buckets'][-1]},
+            timeouts=_stats['timeouts'],
+            liveness_checks=_stats['liveness_checks'],
+            liveness_failures=_stats['liveness_failures'],
+            last_liveness_check=_stats['last_liveness_check'],
+        )
+    return stats
+
+
+def init_pool(app):
+    # Must run before db.init_app, which creates the engine from these options.
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    if app.config.get('DB_POOL_PROFILE') == 'pgbouncer':
+        # LISTEN needs a session that stays on one server connection.
+        app.config['CONTENT_VERSION_NOTIFY'] = False
+    app.before_request(lambda: _ensure_monitor(app))
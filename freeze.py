@@ -0,0 +1,247 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from functools import partial
+from threading import Lock, Thread
+from flask import render_template, url_for
+from sqlalchemy.orm import selectinload
+from models import ContentVersion, Project, Technology, project_technologies
+from assets import file_hash, fingerprinted
+from cache import CONTENT_TABLES, on_content_change
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
+STATE_FILE = '.freeze.json'
+# A static host ignores ?tech=, so each technology gets its own page here.
+TECHNOLOGY_DIR = 'projects'
+TECHNOLOGY_LINK = re.compile(r'"/projects\?tech=([a-z0-9-]+)"')
+# Links to pages that need the app (the contact form and search) are dropped.
+DYNAMIC_LINK = re.compile(r'<a href="/(?:contact|search)"[^>]*>.*?</a>\s*', re.S)
+
+def _all_projects():
+    # A static file costs nothing per visit and has no page endpoint to
+    # scroll into, so the export lists every project on one page.
+    from routes.public import PROJECT_ORDER, render_projects
+    return render_projects(Project.query.options(selectinload(Project.tags)).order_by(*PROJECT_ORDER).all(), None)
+
+
+def _technology_projects(technology):
+    from routes.public import PROJECT_ORDER, render_projects
+    projects = (Project.query.options(selectinload(Project.tags))
+                .join(project_technologies, project_technologies.c.project_id == Project.id)
+                .filter(project_technologies.c.technology_id == technology.id)
+                .order_by(*PROJECT_ORDER).all())
+    return render_projects(projects, None, technology=technology)
+
+
+# Output file -> (how to render it: a URL, a template or a function, tables
+# whose changes require a rewrite).
+PAGES = {
+    'index.html': ('/', CONTENT_TABLES),
+    'projects.html': (_all_projects, ('projects',)),
+    '404.html': ('errors/404.html', ()),
+    '500.html': ('errors/500.html', ()),
+}
+
+# Already-compressed formats gain nothing from a .gz/.br sibling.
+SKIP_COMPRESSION = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.ico', '.pdf', '.woff', '.woff2', '.gz', '.br', '.zip')
+
+_export_lock = Lock()
+
+
+def _pages():
+    pages = dict(PAGES)
+    for technology in Technology.query.filter(Technology.project_count > 0).all():
+        pages[f'{TECHNOLOGY_DIR}/{technology.slug}.html'] = (partial(_technology_projects, technology), ('projects',))
+    return pages
+
+
+def _templates_hash():
+    digest = hashlib.sha256()
+    for root, dirs, files in sorted(os.walk(TEMPLATE_DIR)):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, TEMPLATE_DIR).encode())
+            digest.update(file_hash(path).encode())
+    return digest.hexdigest()
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    _write_compressed(path, data)
+
+
+def _write_compressed(path, data):
+    if path.lower().endswith(SKIP_COMPRESSION):
+        return
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _export_assets(output, previous):
+    manifest = {}
+    for root, dirs, files in os.walk(STATIC_DIR):
+        for name in files:
+            source = os.path.join(root, name)
+            rel_path = os.path.relpath(source, STATIC_DIR).replace(os.sep, '/')
+            manifest[rel_path] = fingerprinted(rel_path, file_hash(source))
+            target = os.path.join(output, 'static', manifest[rel_path])
+            if previous.get(rel_path) == manifest[rel_path] and os.path.exists(target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+            with open(source, 'rb') as f:
+                _write_compressed(target, f.read())
+    return manifest
+
+
+def _rewrite_links(html, manifest, cv_links):
+    # Longest paths first so e.g. style.css.map is not clobbered by style.css.
+    for rel_path in sorted(manifest, key=len, reverse=True):
+        html = html.replace(f'/static/{rel_path}"', f'/static/{manifest[rel_path]}"')
+    html = TECHNOLOGY_LINK.sub(rf'"/{TECHNOLOGY_DIR}/\1.html"', html)
+    html = html.replace('"/projects"', '"/projects.html"')
+    html = DYNAMIC_LINK.sub('', html)
+    if cv_links:
+        download_url, cv_path = cv_links
+        html = html.replace(f'"{download_url}"', f'"{cv_path}" download')
+    return html
+
+
+def _cv_links(app, manifest):
+    # The static site has no /download-cv route, so link the file directly.
+    with app.test_request_context():
+        from routes.public import get_site_settings
+        cv_filename = get_site_settings()['cv_filename']
+        download_url = url_for('public.download_cv')
+    for rel_path in (f'uploads/documents/{cv_filename}', f'documents/{cv_filename}'):
+        if cv_filename and rel_path in manifest:
+            return download_url, f'/static/{manifest[rel_path]}'
+    return None
+
+
+def _render_page(app, client, source):
+    if callable(source):
+        with app.test_request_context():
+            return source()
+    if source.startswith('/'):
+        response = client.get(source)
+        if response.status_code != 200:
+            raise RuntimeError(f'{source} returned HTTP {response.status_code}')
+        return response.get_data(as_text=True)
+    with app.test_request_context():
+        return render_template(source)
+
+
+def freeze_site(app, output, full=False):
+    start = time.perf_counter()
+    output = os.path.abspath(output)
+    state_path = os.path.join(output, STATE_FILE)
+    previous = {}
+    if not full and os.path.exists(state_path):
+        with open(state_path) as f:
+            previous = json.load(f)
+
+    with _export_lock, app.app_context():
+        versions = {row.name: row.version for row in ContentVersion.query.all()}
+        manifest = _export_assets(output, previous.get('assets', {}))
+        templates = _templates_hash()
+        # Anything that changes every page's HTML forces a full rewrite.
+        rebuild_all = (
+            full
+            or manifest != previous.get('assets')
+            or templates != previous.get('templates')
+        )
+        old_versions = previous.get('versions', {})
+        cv_links = _cv_links(app, manifest)
+
+        written = []
+        client = app.test_client()
+        pages = _pages()
+        for filename, (source, tables) in pages.items():
+            target = os.path.join(output, filename)
+            changed = any(versions.get(t) != old_versions.get(t) for t in tables)
+            if not (rebuild_all or changed or not os.path.exists(target)):
+                continue
+            html = _rewrite_links(_render_page(app, client, source), manifest, cv_links)
+            _write(target, html.encode('utf-8'))
+            written.append(filename)
+
+        # Drop the pages of technologies no project uses any more.
+        technology_dir = os.path.join(output, TECHNOLOGY_DIR)
+        if os.path.isdir(technology_dir):
+            for name in os.listdir(technology_dir):
+                page = name.removesuffix('.gz').removesuffix('.br')
+                if f'{TECHNOLOGY_DIR}/{page}' not in pages:
+                    os.remove(os.path.join(technology_dir, name))
+
+        # Drop fingerprinted assets that no longer exist in static/.
+        for rel_path, hashed in previous.get('assets', {}).items():
+            if manifest.get(rel_path) != hashed:
+                for suffix in ('', '.gz', '.br'):
+                    stale = os.path.join(output, 'static', hashed + suffix)
+                    if os.path.exists(stale):
+                        os.remove(stale)
+
+        with open(state_path, 'w') as f:
+            json.dump({'versions': versions, 'assets': manifest, 'templates': templates}, f, indent=2)
+
+    return written, time.perf_counter() - start
+
+
+def init_static_export(app):
+    output = app.config.get('STATIC_EXPORT_DIR')
+    if not output:
+        return
+
+    @on_content_change
+    def export_after_save(tables):
+        # Run outside the request; the incremental export only rewrites the
+        # pages whose tables changed.
+        Thread(target=freeze_site, args=(app, output), name='static-export', daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the public portfolio as static files.')
+    parser.add_argument('output', nargs='?', default=os.environ.get('STATIC_EXPORT_DIR', 'build'),
+                        help='output directory (default: $STATIC_EXPORT_DIR or ./build)')
+    parser.add_argument('--full', action='store_true', help='rewrite every page and asset')
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app()
+    written, elapsed = freeze_site(app, args.output, full=args.full)
+    if written:
+        print(f"Wrote {', '.join(written)}")
+    else:
+        print("All pages up to date")
+    if brotli is None:
+        print("Note: install 'brotli' to also write .br files")
+    print(f"Export finished in {elapsed:.2f}s -> {os.path.abspath(args.output)}")
+
+
+if __name__ == '__main__':
+    main()
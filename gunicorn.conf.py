@@ -0,0 +1,160 @@
+# Gunicorn settings, read automatically from the working directory
+# (`gunicorn app:app`). Every value can be overridden with the environment
+# variables below or on the command line.
+import gc
+import os
+from pool_profiles import POOL_PROFILES
+from process_info import rss_bytes
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('true', '1', 'yes')
+
+
+def cpu_count():
+    # CPUs this container may use: the cgroup quota if one is set, else the
+    # CPUs the process is allowed to run on.
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return max(1, int(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def memory_limit():
+    try:
+        with open('/sys/fs/cgroup/memory.max') as f:
+            value = f.read().strip()
+        return None if value == 'max' else int(value)
+    except (OSError, ValueError):
+        return None
+
+
+def db_connections_per_worker(profile):
+    # Pool plus overflow, the content-version LISTEN connection and a spare.
+    sizes = dict(POOL_PROFILES.get(profile, POOL_PROFILES['default']))
+    for key, setting in (('pool_size', 'DB_POOL_SIZE'), ('max_overflow', 'DB_MAX_OVERFLOW')):
+        if os.environ.get(setting):
+            sizes[key] = int(os.environ[setting])
+    return sizes['pool_size'] + sizes['max_overflow'] + 2
+
+
+def _default_workers(worker_class, cpus):
+    if worker_class == 'sync':
+        return cpus * 2 + 1
+    # Threads or greenlets provide the concurrency; one process per CPU
+    # (plus one for gthread, to cover a worker blocked on the GIL).
+    return cpus + 1 if worker_class == 'gthread' else cpus
+
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+threads = int(os.environ.get('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+# A sync worker runs one request at a time, so it never needs a bigger pool.
+if worker_class == 'sync':
+    os.environ.setdefault('DB_POOL_PROFILE', 'small')
+
+_cpus = cpu_count()
+workers = int(os.environ.get('GUNICORN_WORKERS') or os.environ.get('WEB_CONCURRENCY') or 0) \
+    or _default_workers(worker_class, _cpus)
+# Fit the worker count to the container's memory: GUNICORN_WORKER_MEMORY_MB
+# is the steady-state RSS of one worker, as reported in the log below.
+_worker_memory = int(os.environ.get('GUNICORN_WORKER_MEMORY_MB', 0)) * 1024 * 1024
+_limit = memory_limit()
+if _worker_memory and _limit:
+    workers = max(1, min(workers, int(_limit * 0.9 // _worker_memory)))
+workers = min(workers, int(os.environ.get('GUNICORN_MAX_WORKERS', 32)))
+# Keep the pools of all workers within the connections PostgreSQL allows
+# (max_connections, less a few for the master, migrations and psql).
+# PgBouncer client connections are cheap, so its profile is not capped.
+_db_profile = os.environ.get('DB_POOL_PROFILE', 'default').lower()
+_db_budget = int(os.environ.get('DB_CONNECTION_BUDGET', 90))
+if _db_budget and _db_profile != 'pgbouncer' and os.environ.get('DATABASE_URL', '').startswith('postgresql'):
+    workers = max(1, min(workers, _db_budget // db_connections_per_worker(_db_profile)))
+
+# Load the app once in the master and fork it into the workers, so code,
+# compiled templates and caches built at startup are shared copy-on-write.
+# gevent must monkey-patch before the app is imported, so it does not preload
+# unless asked to.
+preload_app = _env_bool('GUNICORN_PRELOAD', worker_class != 'gevent')
+
+# Recycle workers to bound slow leaks; the jitter keeps them from all
+# restarting at the same moment.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max(1, max_requests // 10)))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# The worker heartbeat file lives on tmpfs; Docker's overlay filesystem can
+# stall it long enough for the master to kill healthy workers.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# Log each worker's RSS every this many requests (0 to disable).
+rss_log_interval = int(os.environ.get('GUNICORN_RSS_LOG_INTERVAL', 500))
+
+
+def on_starting(server):
+    # Worker metric files from a previous run would be added to this one's.
+    from metrics import clear_metrics_dir
+    clear_metrics_dir(os.environ.get('METRICS_DIR') or os.path.join(os.path.dirname(__file__), 'instance', 'metrics'))
+
+
+def when_ready(server):
+    server.log.info('Serving with %d %s worker(s) (%d CPU(s), threads=%d, preload=%s)',
+                    server.num_workers, worker_class, _cpus, threads, preload_app)
+    if preload_app:
+        # Move everything the app allocated at startup into the permanent
+        # generation. The collector then never touches those objects in the
+        # workers, so their pages stay shared instead of being copied when
+        # reference-cycle GC writes to object headers.
+        gc.collect()
+        gc.freeze()
+        server.log.info('Master RSS after preload: %.1f MiB', (rss_bytes() or 0) / 1048576)
+
+
+def post_fork(server, worker):
+    flask_app = getattr(server.app, 'callable', None)
+    if flask_app is None:
+        return
+    # Pooled connections opened in the master (e.g. by template warmup or
+    # create_all) must not be shared with the children. close=False leaves
+    # the parent's sockets alone and just drops them from this pool.
+    from models import db
+    with flask_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # Take over spool files a crashed worker left behind now, rather than on
+    # the first contact form submission.
+    from contact_queue import contact_queue
+    if contact_queue.enabled:
+        contact_queue.start()
+
+
+def post_request(worker, req, environ, resp):
+    if not rss_log_interval:
+        return
+    worker.served = getattr(worker, 'served', 0) + 1
+    if worker.served % rss_log_interval == 0:
+        worker.log.info('Worker %d RSS %.1f MiB after %d requests',
+                        worker.pid, (rss_bytes() or 0) / 1048576, worker.served)
+
+
+def worker_exit(server, worker):
+    server.log.info('Worker %d exiting: RSS %.1f MiB after %d requests',
+                    worker.pid, (rss_bytes() or 0) / 1048576, getattr(worker, 'served', 0))
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from models import db
+from cache import bump_content_version
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+UPLOAD_DIR = os.path.join(BASE_DIR, 'static', 'uploads', 'images')
+UPLOAD_URL = '/static/uploads/images/'
+VARIANT_WIDTHS = (160, 400, 800)
+
+_executor = {'pid': None, 'pool': None}
+_variants_cache = {}
+_variants_lock = Lock()
+
+
+def _pool(app):
+    # Executor threads do not survive a fork; give each worker its own pool.
+    if _executor['pid'] != os.getpid():
+        _executor['pid'] = os.getpid()
+        _executor['pool'] = ThreadPoolExecutor(
+            max_workers=app.config.get('IMAGE_WORKERS', 2),
+            thread_name_prefix='image-variants',
+        )
+    return _executor['pool']
+
+
+def save_uploaded_image(app, file_storage, table):
+    # Store the original under a content-hashed name and return its URL right
+    # away; the resized variants are rendered in the background and the
+    # table's content version is bumped once they exist, so cached pages pick
+    # up the new srcset.
+    data = file_storage.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    ext = os.path.splitext(file_storage.filename or '')[1].lower() or '.jpg'
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    filename = f'{digest}{ext}'
+    path = os.path.join(UPLOAD_DIR, filename)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    if Image is None:
+        logger.warning('Pillow is not installed; serving %s without resized variants', filename)
+    else:
+        _pool(app).submit(_generate_variants, app, path, digest, table)
+    return UPLOAD_URL + filename
+
+
+def _generate_variants(app, path, digest, table):
+    try:
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+            has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+            fallback_ext, fallback_format = ('.png', 'PNG') if has_alpha else ('.jpg', 'JPEG')
+            for width in VARIANT_WIDTHS:
+                if width > image.width and width != VARIANT_WIDTHS[0]:
+                    break
+                resized = image.copy()
+                resized.thumbnail((width, width * 4), Image.LANCZOS)
+                if not has_alpha:
+                    resized = resized.convert('RGB')
+                resized.save(os.path.join(UPLOAD_DIR, f'{digest}-{width}.webp'), 'WEBP', quality=80, method=6)
+                resized.save(os.path.join(UPLOAD_DIR, f'{digest}-{width}{fallback_ext}'), fallback_format,
+                             optimize=True, **({'quality': 82, 'progressive': True} if fallback_format == 'JPEG' else {}))
+    except Exception:
+        logger.exception('Failed to generate image variants for %s', path)
+        return
+
+    with _variants_lock:
+        _variants_cache.clear()
+    with app.app_context():
+        bump_content_version(db.session, [table])
+        db.session.commit()
+
+
+def image_variants(url):
+    # {'webp': srcset, 'fallback': srcset} for uploaded images that have
+    # variants on disk, otherwise None (external URLs, or still processing).
+    if not url or not url.startswith(UPLOAD_URL):
+        return None
+    with _variants_lock:
+        if url in _variants_cache:
+            return _variants_cache[url]
+
+    digest = os.path.splitext(url[len(UPLOAD_URL):])[0]
+    sources = {'webp': [], 'fallback': []}
+    for width in VARIANT_WIDTHS:
+        for ext in ('.webp', '.jpg', '.png'):
+            name = f'{digest}-{width}{ext}'
+            if os.path.exists(os.path.join(UPLOAD_DIR, name)):
+                key = 'webp' if ext == '.webp' else 'fallback'
+                sources[key].append(f'{UPLOAD_URL}{name} {width}w')
+    if not (sources['webp'] and sources['fallback']):
+        # Not cached: another worker may still be rendering the variants.
+        return None
+    variants = {key: ', '.join(value) for key, value in sources.items()}
+    with _variants_lock:
+        _variants_cache[url] = variants
+    return variants
+
+
+def init_images(app):
+    app.jinja_env.globals['image_variants'] = image_variants
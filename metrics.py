@@ -0,0 +1,290 @@
+import atexit
+import fcntl
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from flask import Response, abort, current_app, request
+from flask.signals import before_render_template, template_rendered
+from db_pool import pool_stats
+from process_info import process_alive, rss_bytes
+from sql_profiler import request_queries
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# name: (type, help, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests handled, by endpoint, method and status.', None),
+    'http_request_duration_seconds': ('histogram', 'Request latency by endpoint.', LATENCY_BUCKETS),
+    'http_response_size_bytes': ('histogram', 'Response body size by endpoint.', SIZE_BUCKETS),
+    'http_request_db_queries': ('histogram', 'SQL statements executed per request.', QUERY_BUCKETS),
+    'http_request_db_seconds': ('histogram', 'Time spent in SQL per request.', LATENCY_BUCKETS),
+    'template_render_seconds': ('histogram', 'Template render time by template.', LATENCY_BUCKETS),
+    'db_pool_checked_out': ('gauge', 'Pooled connections in use, summed over live workers.', None),
+    'db_pool_overflow': ('gauge', 'Overflow connections open, summed over live workers.', None),
+    'db_pool_checkout_timeouts_total': ('counter', 'Pool checkouts that timed out.', None),
+    'process_resident_memory_bytes': ('gauge', 'Resident memory of each live worker.', None),
+}
+
+_local = threading.local()
+
+
+# Per-process metric values. Each worker writes them to <METRICS_DIR>/<pid>.json
+# from a background thread, and /metrics merges the files of every worker, so
+# recording a value never does I/O.
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            entry = self.histograms.get(key)
+            if entry is None:
+                entry = self.histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            else:
+                entry[0][-1] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(buckets), total, count]
+                               for (name, labels), (buckets, total, count) in self.histograms.items()],
+            }
+
+
+registry = Registry()
+_state = {'pid': None, 'dir': None, 'interval': 1.0}
+
+
+def _labels(**labels):
+    return tuple(sorted(labels.items()))
+
+
+def _before_render(app, template, context, **extra):
+    _local.render_start = time.perf_counter()
+
+
+def _after_render(app, template, context, **extra):
+    start = getattr(_local, 'render_start', None)
+    if start is not None:
+        _local.render_start = None
+        registry.observe('template_render_seconds', _labels(template=template.name or 'string'),
+                         time.perf_counter() - start)
+
+
+def _before_request():
+    _ensure_writer()
+    _local.start = time.perf_counter()
+
+
+def _after_request(response):
+    start = getattr(_local, 'start', None)
+    if start is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    labels = _labels(endpoint=endpoint)
+    registry.inc('http_requests_total', _labels(endpoint=endpoint, method=request.method,
+                                                status=str(response.status_code)))
+    registry.observe('http_request_duration_seconds', labels, time.perf_counter() - start)
+    if response.content_length is not None:
+        registry.observe('http_response_size_bytes', labels, response.content_length)
+    # Counted by the SQL profiler's statement hooks, which time every query.
+    queries = request_queries()
+    if queries is not None:
+        registry.observe('http_request_db_queries', labels, queries[0])
+        registry.observe('http_request_db_seconds', labels, queries[1])
+    _local.start = None
+    return response
+
+
+def _gauges():
+    # Point-in-time values of this process, written with its counters.
+    gauges = []
+    try:
+        stats = pool_stats()
+    except Exception:
+        stats = {}
+    if 'checked_out' in stats:
+        gauges.append(['db_pool_checked_out', [], stats['checked_out']])
+        gauges.append(['db_pool_overflow', [], stats['overflow']])
+    rss = rss_bytes()
+    if rss is not None:
+        gauges.append(['process_resident_memory_bytes', [['pid', str(os.getpid())]], rss])
+    return gauges, stats.get('timeouts', 0)
+
+
+def _write(app):
+    with app.app_context():
+        gauges, timeouts = _gauges()
+    data = registry.snapshot()
+    data['gauges'] = gauges
+    if timeouts:
+        data['counters'].append(['db_pool_checkout_timeouts_total', [], timeouts])
+    path = os.path.join(_state['dir'], f'{os.getpid()}.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+
+
+def _run_writer(app):
+    while True:
+        time.sleep(_state['interval'])
+        try:
+            _write(app)
+        except Exception:
+            app.logger.exception('Failed to write metrics')
+
+
+def _ensure_writer():
+    if _state['pid'] == os.getpid():
+        return
+    app = current_app._get_current_object()
+    _state['pid'] = os.getpid()
+    registry.counters.clear()
+    registry.histograms.clear()
+    os.makedirs(_state['dir'], exist_ok=True)
+    threading.Thread(target=_run_writer, args=(app,), name='metrics-writer', daemon=True).start()
+    atexit.register(_write, app)
+
+
+def _merge(totals, data, include_gauges):
+    counters, histograms, gauges = totals
+    for name, labels, value in data.get('counters', []):
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, buckets, total, count in data.get('histograms', []):
+        key = (name, tuple(map(tuple, labels)))
+        entry = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+        entry[0] = [a + b for a, b in zip(entry[0], buckets)]
+        entry[1] += total
+        entry[2] += count
+    if include_gauges:
+        for name, labels, value in data.get('gauges', []):
+            key = (name, tuple(map(tuple, labels)))
+            gauges[key] = gauges.get(key, 0) + value
+
+
+def _as_data(totals):
+    counters, histograms, gauges = totals
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), buckets, total, count]
+                       for (name, labels), (buckets, total, count) in histograms.items()],
+    }
+
+
+def collect(directory):
+    # Sum every worker's file. Files of workers that have exited are folded
+    # into archive.json so their counts survive (counters must never go
+    # down) while their gauges are dropped.
+    totals = ({}, {}, {})
+    with open(os.path.join(directory, '.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = os.path.join(directory, 'archive.json')
+        archive = ({}, {}, {})
+        if os.path.exists(archive_path):
+            with open(archive_path) as f:
+                _merge(archive, json.load(f), include_gauges=False)
+        archived = False
+        for path in glob.glob(os.path.join(directory, '[0-9]*.json')):
+            pid = int(os.path.basename(path).split('.')[0])
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if process_alive(pid):
+                _merge(totals, data, include_gauges=True)
+            else:
+                _merge(archive, data, include_gauges=False)
+                os.remove(path)
+                archived = True
+        if archived:
+            with open(archive_path + '.tmp', 'w') as f:
+                json.dump(_as_data(archive), f)
+            os.replace(archive_path + '.tmp', archive_path)
+    _merge(totals, _as_data(archive), include_gauges=False)
+    return totals
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+def render(totals):
+    counters, histograms, gauges = totals
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket in zip(list(buckets) + ['+Inf'], counts):
+                    cumulative += bucket
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+                lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        else:
+            values = counters if kind == 'counter' else gauges
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    expected = f"Bearer {current_app.config['METRICS_TOKEN']}"
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode()):
+        abort(401)
+    _write(current_app._get_current_object())
+    return Response(render(collect(_state['dir'])), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def clear_metrics_dir(directory):
+    # Called by the gunicorn master before it forks, so a restart starts
+    # counting from zero rather than adding to the previous run.
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+
+def init_metrics(app):
+    # Per-worker memory and the endpoint list are not for the public, so
+    # there is no /metrics without a token to protect it.
+    if not app.config.get('METRICS_ENABLED', True) or not app.config.get('METRICS_TOKEN'):
+        return
+    _state['dir'] = app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+    _state['interval'] = app.config.get('METRICS_FLUSH_INTERVAL', 1.0)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.before_request(_before_request)
+    # Registered before the other after_request hooks, so it runs after them
+    # and sees the final (compressed) response.
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -28,12 +28,46 @@ class Project(db.Model):
     image = db.Column(db.String(255))
     technologies = db.Column(db.String(500))
     link = db.Column(db.String(255))
-    date_created = db.Column(db.DateTime, default=datetime.utcnow)
-    order = db.Column(db.Integer, default=0)
+    # NOT NULL because they are the keyset of the project list.
+    date_created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    order = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Matches the display order exactly, directions included, so the keyset
+    # pages of /projects and the homepage's first six are index range scans.
+    __table_args__ = (
+        db.Index('ix_projects_order_date_created_id', order, date_created.desc(), id.desc()),
+    )
+    
+    # Kept in step with the technologies text by a flush hook (tags.py).
+    tags = db.relationship('Technology', secondary='project_technologies', order_by='Technology.name',
+                           back_populates='projects')
     
     def __repr__(self):
         return f'<Project {self.title}>'
 
+# The primary key serves lookups by project; the reverse index serves the
+# /projects?tech= filter.
+project_technologies = db.Table(
+    'project_technologies',
+    db.Column('project_id', db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('technology_id', db.Integer, db.ForeignKey('technologies.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_project_technologies_technology_id_project_id', 'technology_id', 'project_id'),
+)
+
+class Technology(db.Model):
+    __tablename__ = 'technologies'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(100), unique=True, nullable=False)
+    # Precomputed for the tag cloud; kept current by tags.py.
+    project_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    projects = db.relationship('Project', secondary='project_technologies', back_populates='tags', viewonly=True)
+    
+    def __repr__(self):
+        return f'<Technology {self.name}>'
+
 class Skill(db.Model):
     __tablename__ = 'skills'
     
@@ -41,7 +75,10 @@ class Skill(db.Model):
     name = db.Column(db.String(100), nullable=False)
     category = db.Column(db.String(100))
     proficiency = db.Column(db.Integer, default=50)
-    order = db.Column(db.Integer, default=0)
+    order = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Keyset of the API's list pages.
+    __table_args__ = (db.Index('ix_skills_order_id', 'order', 'id'),)
     
     def __repr__(self):
         return f'<Skill {self.name}>'
@@ -55,7 +92,10 @@ class Testimonial(db.Model):
     company = db.Column(db.String(150))
     message = db.Column(db.Text, nullable=False)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
-    order = db.Column(db.Integer, default=0)
+    order = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Keyset of the API's list pages.
+    __table_args__ = (db.Index('ix_testimonials_order_id', 'order', 'id'),)
     
     def __repr__(self):
         return f'<Testimonial from {self.name}>'
@@ -70,7 +110,10 @@ class Experience(db.Model):
     start_date = db.Column(db.String(50), nullable=False)
     end_date = db.Column(db.String(50))
     description = db.Column(db.Text, nullable=False)
-    order = db.Column(db.Integer, default=0)
+    order = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Keyset of the API's list pages.
+    __table_args__ = (db.Index('ix_experiences_order_id', 'order', 'id'),)
     
     def __repr__(self):
         return f'<Experience {self.title} at {self.company}>'
@@ -83,9 +126,16 @@ class ContactMessage(db.Model):
     email = db.Column(db.String(120), nullable=False)
     subject = db.Column(db.String(200), nullable=False)
     message = db.Column(db.Text, nullable=False)
-    date_received = db.Column(db.DateTime, default=datetime.utcnow)
+    # NOT NULL because it is the keyset of the inbox.
+    date_received = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     status = db.Column(db.String(20), default='unread')
     
+    # Back the inbox's keyset pagination, with and without a status filter.
+    __table_args__ = (
+        db.Index('ix_contact_messages_date_received_id', 'date_received', 'id'),
+        db.Index('ix_contact_messages_status_date_received_id', 'status', 'date_received', 'id'),
+    )
+    
     def __repr__(self):
         return f'<ContactMessage from {self.name}>'
 
@@ -112,7 +162,55 @@ class SocialLink(db.Model):
     platform = db.Column(db.String(50), nullable=False)
     url = db.Column(db.String(500), nullable=False)
     icon_class = db.Column(db.String(100), nullable=False)
-    order = db.Column(db.Integer, default=0)
+    order = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Keyset of the API's list pages.
+    __table_args__ = (db.Index('ix_social_links_order_id', 'order', 'id'),)
     
     def __repr__(self):
         return f'<SocialLink {self.platform}>'
+
+class ContentVersion(db.Model):
+    __tablename__ = 'content_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ContentVersion {self.name}={self.version}>'
+
+class PortfolioSnapshot(db.Model):
+    __tablename__ = 'portfolio_snapshots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.Text, nullable=False)
+    date_built = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<PortfolioSnapshot v{self.version}>'
+
+class RecordCount(db.Model):
+    __tablename__ = 'record_counts'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<RecordCount {self.name}={self.value}>'
+
+class SearchDocument(db.Model):
+    __tablename__ = 'search_documents'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    ref_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(300), nullable=False)
+    body = db.Column(db.Text, nullable=False, default='')
+    
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'ref_id', name='uq_search_documents_kind_ref_id'),
+    )
+    
+    def __repr__(self):
+        return f'<SearchDocument {self.kind}:{self.ref_id}>'
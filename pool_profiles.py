@@ -0,0 +1,13 @@
+# Connection pool profiles, shared by db_pool.py and gunicorn.conf.py. Only
+# plain data, so the gunicorn config can import it before the app is loaded.
+
+# pool_size, max_overflow, pool_timeout. Size the pool to the concurrency of
+# one worker: 'small' suits many sync workers, 'large' gthread workers.
+POOL_PROFILES = {
+    'default': {'pool_size': 5, 'max_overflow': 5, 'pool_timeout': 10},
+    'small': {'pool_size': 2, 'max_overflow': 3, 'pool_timeout': 5},
+    'large': {'pool_size': 10, 'max_overflow': 10, 'pool_timeout': 30},
+    # PgBouncer multiplexes server connections itself; client connections to
+    # it are cheap, so keep a few and let overflow absorb bursts.
+    'pgbouncer': {'pool_size': 3, 'max_overflow': 12, 'pool_timeout': 10},
+}
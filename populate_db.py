@@ -1,15 +1,59 @@
+import argparse
+import random
+from datetime import datetime, timedelta
 from app import create_app
-from models import db, User, Project, Skill, Experience, Testimonial, SiteSettings, SocialLink
+from models import db, User, Project, Technology, Skill, Experience, Testimonial, SiteSettings, SocialLink, ContactMessage
+from sqlalchemy import text
 from werkzeug.security import generate_password_hash
+from cache import bump_content_version, CONTENT_TABLES
+from counters import rebuild_counters
+from search import reindex_all
+from tags import rebuild_tags
+from data_transfer import bulk_insert
 import os
 
-def populate_database():
-    app = create_app()
+# Rows generated per unit of --scale.
+SCALE_ROWS = {'projects': 1000, 'messages': 100000, 'skills': 50, 'experiences': 20, 'testimonials': 20}
+SEED_CATEGORIES = ['Networking', 'Virtualization', 'Systems', 'Cloud Platforms', 'Automation', 'Security']
+SEED_TECHNOLOGIES = ['Cisco', 'Juniper', 'BGP', 'OSPF', 'VMware', 'Docker', 'Kubernetes', 'Linux', 'Ansible',
+                     'Terraform', 'Python', 'AWS', 'Azure', 'Grafana', 'Prometheus', 'pfSense', 'MPLS', 'VPN']
+SEED_WORDS = ['network', 'migration', 'firewall', 'automation', 'monitoring', 'datacenter', 'redundant',
+              'cluster', 'latency', 'routing', 'backup', 'storage', 'security', 'upgrade', 'campus', 'wireless']
+
+def populate_database(app=None):
+    app = app or create_app()
     
     with app.app_context():
         # Create all tables first
         print("Creating database tables...")
         db.create_all()
+        # create_all() skips tables that already exist, so add any indexes
+        # introduced since they were created.
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        # Lists are paged by their order columns; older versions left order
+        # NULL when blank, and projects.date_created and
+        # contact_messages.date_received were nullable.
+        for model in (Project, Skill, Experience, Testimonial, SocialLink):
+            model.query.filter(model.order.is_(None)).update({model.order: 0})
+        Project.query.filter(Project.date_created.is_(None)).update({Project.date_created: datetime.utcnow()})
+        ContactMessage.query.filter(ContactMessage.date_received.is_(None)).update(
+            {ContactMessage.date_received: datetime.utcnow()})
+        if db.engine.dialect.name == 'postgresql':
+            # SQLite cannot alter a column; its new databases get NOT NULL from the models.
+            for table in ('skills', 'experiences', 'testimonials', 'social_links'):
+                db.session.execute(text(f'ALTER TABLE {table} ALTER COLUMN "order" SET NOT NULL'))
+            db.session.execute(text('ALTER TABLE projects ALTER COLUMN "order" SET NOT NULL, '
+                                    'ALTER COLUMN date_created SET NOT NULL'))
+            db.session.execute(text('ALTER TABLE contact_messages ALTER COLUMN date_received SET NOT NULL'))
+        db.session.commit()
+        # Technology tags were introduced after projects: derive them once.
+        if Technology.query.first() is None and Project.query.first() is not None:
+            print("Building technology tags...")
+            rebuild_tags()
+            bump_content_version(db.session, ['projects'])
+            db.session.commit()
         
         # Check if demo data should be populated
         populate_demo = os.environ.get('POPULATE_DEMO_DATA', 'false').lower() in ('true', '1', 'yes')
@@ -28,6 +72,11 @@ def populate_database():
             # Only create admin user if it doesn't exist
             if User.query.filter_by(username='admin').first():
                 print("Admin user already exists, skipping user creation.")
+                # Public pages no longer create the settings row on demand.
+                if not SiteSettings.query.first():
+                    print("Setting up site settings...")
+                    db.session.add(SiteSettings())
+                    db.session.commit()
                 return
         
         print("Creating admin user...")
@@ -202,11 +251,120 @@ def populate_database():
             )
             db.session.add(site_settings)
         
+        # bulk_save_objects() and Query.delete() bypass the flush hooks that
+        # keep the content version, dashboard counters, search index and tags
+        # current. The version is bumped last so the snapshot includes the tags.
+        rebuild_counters()
+        reindex_all()
+        rebuild_tags()
+        bump_content_version(db.session, CONTENT_TABLES)
         db.session.commit()
         print("\nDatabase populated successfully!")
         print("\nAdmin credentials:")
         print("Username: admin")
         print(f"Password: {admin_password}")
 
+def _sentence(rng, words):
+    return ' '.join(rng.choice(SEED_WORDS) for _ in range(words)).capitalize() + '.'
+
+def _project_rows(count, rng):
+    start = datetime.utcnow() - timedelta(days=count)
+    for i in range(count):
+        yield {
+            'title': f'{_sentence(rng, 3)[:-1]} #{i + 1}',
+            'description': ' '.join(_sentence(rng, 12) for _ in range(3)),
+            'technologies': ', '.join(rng.sample(SEED_TECHNOLOGIES, 4)),
+            'link': f'https://example.com/projects/{i + 1}',
+            'date_created': start + timedelta(days=i),
+            'order': i,
+        }
+
+def _message_rows(count, rng):
+    start = datetime.utcnow() - timedelta(minutes=count)
+    for i in range(count):
+        yield {
+            'name': f'Visitor {i + 1}',
+            'email': f'visitor{i + 1}@example.com',
+            'subject': _sentence(rng, 5),
+            'message': ' '.join(_sentence(rng, 15) for _ in range(2)),
+            'date_received': start + timedelta(minutes=i),
+            'status': 'unread' if rng.random() < 0.3 else 'read',
+        }
+
+def _skill_rows(count, rng):
+    for i in range(count):
+        yield {
+            'name': f'{rng.choice(SEED_TECHNOLOGIES)} {i + 1}',
+            'category': SEED_CATEGORIES[i % len(SEED_CATEGORIES)],
+            'proficiency': rng.randint(50, 100),
+            'order': i // len(SEED_CATEGORIES),
+        }
+
+def _experience_rows(count, rng):
+    for i in range(count):
+        year = 2024 - 2 * i
+        yield {
+            'title': f'{_sentence(rng, 2)[:-1]} Engineer',
+            'company': f'Company {i + 1}',
+            'location': 'Remote',
+            'start_date': f'Jan {year - 2}',
+            'end_date': 'Present' if i == 0 else f'Dec {year - 1}',
+            'description': ' '.join(_sentence(rng, 12) for _ in range(3)),
+            'order': i + 1,
+        }
+
+def _testimonial_rows(count, rng):
+    start = datetime.utcnow() - timedelta(days=count)
+    for i in range(count):
+        yield {
+            'name': f'Client {i + 1}',
+            'role': 'IT Manager',
+            'company': f'Company {i + 1}',
+            'message': ' '.join(_sentence(rng, 12) for _ in range(2)),
+            'date_created': start + timedelta(days=i),
+            'order': i + 1,
+        }
+
+def seed_scale(app, projects=0, messages=0, seed=0, skills=0, experiences=0, testimonials=0):
+    # Synthetic content for load testing, inserted in batches (COPY on
+    # PostgreSQL, executemany elsewhere) and committed per batch, so memory
+    # use is flat however many rows are asked for. The same seed always
+    # produces the same data.
+    rng = random.Random(seed)
+    plan = [
+        ('projects', Project, _project_rows, projects),
+        ('skills', Skill, _skill_rows, skills),
+        ('experiences', Experience, _experience_rows, experiences),
+        ('testimonials', Testimonial, _testimonial_rows, testimonials),
+        ('contact messages', ContactMessage, _message_rows, messages),
+    ]
+    with app.app_context():
+        for label, model, rows, count in plan:
+            if count:
+                print(f"Seeding {count} {label}...")
+                bulk_insert(model.__table__, rows(count, rng), commit=True)
+        content = [model.__tablename__ for _, model, _, count in plan if count and model is not ContactMessage]
+        rebuild_counters()
+        if content:
+            reindex_all()
+        if projects:
+            rebuild_tags()
+        bump_content_version(db.session, content)
+        db.session.commit()
+
 if __name__ == '__main__':
-    populate_database()
+    parser = argparse.ArgumentParser(description='Create the tables, the admin user and (optionally) demo data.')
+    parser.add_argument('--projects', type=int, default=0, help='also seed this many synthetic projects')
+    parser.add_argument('--messages', type=int, default=0, help='also seed this many synthetic contact messages')
+    parser.add_argument('--scale', type=int, default=0,
+                        help='seed synthetic content of every kind; each unit adds '
+                             + ', '.join(f'{count} {name}' for name, count in SCALE_ROWS.items()))
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the synthetic data')
+    args = parser.parse_args()
+    counts = {name: count * args.scale for name, count in SCALE_ROWS.items()}
+    counts['projects'] = args.projects or counts['projects']
+    counts['messages'] = args.messages or counts['messages']
+    app = create_app()
+    populate_database(app)
+    if any(counts.values()):
+        seed_scale(app, seed=args.seed, **counts)
@@ -0,0 +1,24 @@
+import os
+
+# Facts about worker processes, shared by gunicorn.conf.py and metrics.py.
+# Only the standard library, so the gunicorn config can import it before the
+# app is loaded.
+
+
+def rss_bytes(pid='self'):
+    # Resident set size; unlike ru_maxrss this is current, not the peak.
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
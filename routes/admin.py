@@ -1,9 +1,19 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify, abort, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
 from urllib.parse import urlparse, urljoin
 from werkzeug.utils import secure_filename
+from sqlalchemy import case, delete, func, select, tuple_, update
+from datetime import date, datetime, timedelta
 from models import db, User, Project, Skill, Testimonial, ContactMessage, Experience, SiteSettings, SocialLink
+from counters import adjust_counters, get_counters, UNREAD_MESSAGES
+from cache import bump_content_version
+from contact_queue import contact_queue
+from db_pool import pool_stats as get_pool_stats
+from images import save_uploaded_image
 from forms import LoginForm, ProjectForm, SkillForm, TestimonialForm, ExperienceForm, SiteSettingsForm, SocialLinkForm
+import csv
+import io
+import json
 import os
 
 admin_bp = Blueprint('admin', __name__)
@@ -42,20 +52,15 @@ def logout():
 @admin_bp.route('/dashboard')
 @login_required
 def dashboard():
-    project_count = Project.query.count()
-    skill_count = Skill.query.count()
-    testimonial_count = Testimonial.query.count()
-    experience_count = Experience.query.count()
-    message_count = ContactMessage.query.filter_by(status='unread').count()
-    total_messages = ContactMessage.query.count()
+    counts = get_counters()
     
     return render_template('admin/dashboard.html',
-                         project_count=project_count,
-                         skill_count=skill_count,
-                         testimonial_count=testimonial_count,
-                         experience_count=experience_count,
-                         message_count=message_count,
-                         total_messages=total_messages)
+                         project_count=counts['projects'],
+                         skill_count=counts['skills'],
+                         testimonial_count=counts['testimonials'],
+                         experience_count=counts['experiences'],
+                         message_count=counts[UNREAD_MESSAGES],
+                         total_messages=counts['contact_messages'])
 
 @admin_bp.route('/projects')
 @login_required
@@ -74,7 +79,8 @@ def add_project():
             image=form.image.data,
             technologies=form.technologies.data,
             link=form.link.data,
-            order=form.order.data
+            # The public list pages by order; NULL would fall outside its keyset.
+            order=form.order.data or 0
         )
         db.session.add(project)
         db.session.commit()
@@ -95,7 +101,7 @@ def edit_project(id):
         project.image = form.image.data
         project.technologies = form.technologies.data
         project.link = form.link.data
-        project.order = form.order.data
+        project.order = form.order.data or 0
         db.session.commit()
         flash('Project updated successfully!', 'success')
         return redirect(url_for('admin.projects'))
@@ -126,7 +132,7 @@ def add_skill():
             name=form.name.data,
             category=form.category.data,
             proficiency=form.proficiency.data,
-            order=form.order.data
+            order=form.order.data or 0
         )
         db.session.add(skill)
         db.session.commit()
@@ -145,7 +151,7 @@ def edit_skill(id):
         skill.name = form.name.data
         skill.category = form.category.data
         skill.proficiency = form.proficiency.data
-        skill.order = form.order.data
+        skill.order = form.order.data or 0
         db.session.commit()
         flash('Skill updated successfully!', 'success')
         return redirect(url_for('admin.skills'))
@@ -177,7 +183,7 @@ def add_testimonial():
             role=form.role.data,
             company=form.company.data,
             message=form.message.data,
-            order=form.order.data
+            order=form.order.data or 0
         )
         db.session.add(testimonial)
         db.session.commit()
@@ -197,7 +203,7 @@ def edit_testimonial(id):
         testimonial.role = form.role.data
         testimonial.company = form.company.data
         testimonial.message = form.message.data
-        testimonial.order = form.order.data
+        testimonial.order = form.order.data or 0
         db.session.commit()
         flash('Testimonial updated successfully!', 'success')
         return redirect(url_for('admin.testimonials'))
@@ -231,7 +237,7 @@ def add_experience():
             start_date=form.start_date.data,
             end_date=form.end_date.data,
             description=form.description.data,
-            order=form.order.data
+            order=form.order.data or 0
         )
         db.session.add(experience)
         db.session.commit()
@@ -253,7 +259,7 @@ def edit_experience(id):
         experience.start_date = form.start_date.data
         experience.end_date = form.end_date.data
         experience.description = form.description.data
-        experience.order = form.order.data
+        experience.order = form.order.data or 0
         db.session.commit()
         flash('Experience updated successfully!', 'success')
         return redirect(url_for('admin.experiences'))
@@ -269,11 +275,207 @@ def delete_experience(id):
     flash('Experience deleted successfully!', 'success')
     return redirect(url_for('admin.experiences'))
 
+MESSAGE_STATUSES = ('unread', 'read')
+MESSAGE_PREVIEW_LENGTH = 150
+
+def parse_message_cursor(value):
+    try:
+        timestamp, message_id = value.rsplit(',', 1)
+        return datetime.fromisoformat(timestamp), int(message_id)
+    except (AttributeError, ValueError):
+        return None
+
+def message_cursor(message):
+    return f'{message.date_received.isoformat()},{message.id}'
+
 @admin_bp.route('/messages')
 @login_required
 def messages():
-    all_messages = ContactMessage.query.order_by(ContactMessage.date_received.desc()).all()
-    return render_template('admin/messages.html', messages=all_messages)
+    per_page = current_app.config['ADMIN_MESSAGES_PER_PAGE']
+    status = request.args.get('status')
+    if status not in MESSAGE_STATUSES:
+        status = None
+    before = parse_message_cursor(request.args.get('before'))
+    after = parse_message_cursor(request.args.get('after')) if not before else None
+    
+    # Only the columns the list shows, with the body cut down in SQL.
+    query = db.session.query(
+        ContactMessage.id,
+        ContactMessage.name,
+        ContactMessage.email,
+        ContactMessage.subject,
+        ContactMessage.status,
+        ContactMessage.date_received,
+        func.substr(ContactMessage.message, 1, MESSAGE_PREVIEW_LENGTH + 1).label('preview'),
+    )
+    if status:
+        query = query.filter(ContactMessage.status == status)
+    
+    key = tuple_(ContactMessage.date_received, ContactMessage.id)
+    if after:
+        query = query.filter(key > after).order_by(ContactMessage.date_received, ContactMessage.id)
+    else:
+        if before:
+            query = query.filter(key < before)
+        query = query.order_by(ContactMessage.date_received.desc(), ContactMessage.id.desc())
+    
+    page = query.limit(per_page + 1).all()
+    has_more = len(page) > per_page
+    page = page[:per_page]
+    if after:
+        page.reverse()
+    
+    newer_cursor = older_cursor = None
+    if page:
+        if before or (after and has_more):
+            newer_cursor = message_cursor(page[0])
+        if has_more or after:
+            older_cursor = message_cursor(page[-1])
+    
+    return render_template('admin/messages.html',
+                         messages=page,
+                         status=status,
+                         statuses=MESSAGE_STATUSES,
+                         preview_length=MESSAGE_PREVIEW_LENGTH,
+                         newer_cursor=newer_cursor,
+                         older_cursor=older_cursor)
+
+EXPORT_COLUMNS = ('id', 'date_received', 'status', 'name', 'email', 'subject', 'message')
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+EXPORT_CHUNK_ROWS = 500
+
+def parse_filter_date(values, name):
+    value = values.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        abort(400)
+
+def message_filters(values):
+    # Status and inclusive since/until (YYYY-MM-DD) conditions, shared by the
+    # export and the bulk actions.
+    status = values.get('status')
+    if status and status not in MESSAGE_STATUSES:
+        abort(400)
+    since = parse_filter_date(values, 'since')
+    until = parse_filter_date(values, 'until')
+    conditions = []
+    if status:
+        conditions.append(ContactMessage.status == status)
+    if since:
+        conditions.append(ContactMessage.date_received >= datetime.combine(since, datetime.min.time()))
+    if until:
+        conditions.append(ContactMessage.date_received < datetime.combine(until + timedelta(days=1), datetime.min.time()))
+    return conditions
+
+def csv_safe(value):
+    # Spreadsheets run cells that start with these as formulas.
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return "'" + value
+    return value
+
+def export_rows(statement, fmt):
+    # Rows come from a server-side cursor in batches of EXPORT_CHUNK_ROWS and
+    # leave as one chunk per batch, so memory use does not grow with the
+    # inbox and the header goes out before the first query returns.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue()
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+    for partition in result.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        for row in partition:
+            if fmt == 'csv':
+                writer.writerow([csv_safe(value) for value in row])
+            else:
+                record = dict(zip(EXPORT_COLUMNS, row))
+                received = record['date_received']
+                record['date_received'] = received.isoformat() if received else None
+                buffer.write(json.dumps(record) + '\n')
+        yield buffer.getvalue()
+
+@admin_bp.route('/messages/export')
+@login_required
+def export_messages():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+    statement = (select(*(getattr(ContactMessage, column) for column in EXPORT_COLUMNS))
+                 .where(*message_filters(request.args))
+                 .order_by(ContactMessage.date_received, ContactMessage.id))
+    
+    filename = f'messages-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}'
+    response = Response(stream_with_context(export_rows(statement, fmt)), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    # Stop nginx from buffering the whole export before sending it on.
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+MESSAGE_BULK_ACTIONS = ('read', 'unread', 'delete')
+
+def parse_ids(values):
+    try:
+        ids = [int(value) for value in values]
+    except (TypeError, ValueError):
+        abort(400)
+    if len(set(ids)) != len(ids):
+        abort(400)
+    return ids
+
+@admin_bp.route('/messages/bulk', methods=['POST'])
+@login_required
+def bulk_messages():
+    # One set-based statement per action. These bypass the flush hooks, so
+    # the dashboard counters are adjusted here from the affected row counts.
+    action = request.form.get('action')
+    if action not in MESSAGE_BULK_ACTIONS:
+        abort(400)
+    if request.form.get('scope') == 'filter':
+        conditions = message_filters(request.form)
+    else:
+        ids = parse_ids(request.form.getlist('ids'))
+        if not ids:
+            flash('No messages selected.', 'info')
+            return redirect(url_for('admin.messages', status=request.form.get('status') or None))
+        conditions = [ContactMessage.id.in_(ids)]
+    
+    unread = ContactMessage.status == 'unread'
+    if action == 'delete':
+        deleted_unread = db.session.execute(
+            delete(ContactMessage).where(*conditions, unread).execution_options(synchronize_session=False)
+        ).rowcount
+        deleted_other = db.session.execute(
+            delete(ContactMessage).where(*conditions).execution_options(synchronize_session=False)
+        ).rowcount
+        changed = deleted_unread + deleted_other
+        adjust_counters(db.session, {'contact_messages': -changed, UNREAD_MESSAGES: -deleted_unread})
+        flash(f'Deleted {changed} message(s).', 'success')
+    else:
+        target = unread if action == 'read' else ~unread | ContactMessage.status.is_(None)
+        changed = db.session.execute(
+            update(ContactMessage).where(*conditions, target).values(status=action)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        adjust_counters(db.session, {UNREAD_MESSAGES: changed if action == 'unread' else -changed})
+        flash(f'Marked {changed} message(s) as {action}.', 'success')
+    db.session.commit()
+    return redirect(url_for('admin.messages', status=request.form.get('status') or None))
+
+@admin_bp.route('/messages/queue-stats')
+@login_required
+def contact_queue_stats():
+    return jsonify(contact_queue.stats())
+
+@admin_bp.route('/pool-stats')
+@login_required
+def pool_stats():
+    return jsonify(get_pool_stats())
 
 @admin_bp.route('/messages/view/<int:id>')
 @login_required
@@ -313,18 +515,7 @@ def settings():
         site_settings.about_me = form.about_me.data
         
         if form.profile_image.data:
-            image_file = form.profile_image.data
-            filename = secure_filename(image_file.filename)
-            timestamp = str(int(__import__('time').time()))
-            filename = f"{timestamp}_{filename}"
-            
-            upload_folder = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'uploads', 'images')
-            os.makedirs(upload_folder, exist_ok=True)
-            
-            filepath = os.path.join(upload_folder, filename)
-            image_file.save(filepath)
-            
-            site_settings.profile_image = f"/static/uploads/images/{filename}"
+            site_settings.profile_image = save_uploaded_image(current_app._get_current_object(), form.profile_image.data, 'site_settings')
         
         if form.cv_file.data:
             cv_file = form.cv_file.data
@@ -365,7 +556,7 @@ def add_social_link():
             platform=form.platform.data,
             url=form.url.data,
             icon_class=form.icon_class.data,
-            order=form.order.data
+            order=form.order.data or 0
         )
         db.session.add(social_link)
         db.session.commit()
@@ -384,7 +575,7 @@ def edit_social_link(id):
         social_link.platform = form.platform.data
         social_link.url = form.url.data
         social_link.icon_class = form.icon_class.data
-        social_link.order = form.order.data
+        social_link.order = form.order.data or 0
         db.session.commit()
         flash('Social link updated successfully!', 'success')
         return redirect(url_for('admin.settings'))
@@ -399,3 +590,34 @@ def delete_social_link(id):
     db.session.commit()
     flash('Social link deleted successfully!', 'success')
     return redirect(url_for('admin.settings'))
+
+REORDERABLE_MODELS = {
+    'projects': Project,
+    'skills': Skill,
+    'experiences': Experience,
+    'testimonials': Testimonial,
+    'social-links': SocialLink,
+}
+
+@admin_bp.route('/<any(projects, skills, experiences, testimonials, "social-links"):kind>/reorder', methods=['POST'])
+@login_required
+def reorder(kind):
+    # Takes the complete ordering (every id, first to last) as JSON
+    # {"ids": [...]} or repeated ids form fields, and writes it with a single
+    # UPDATE ... SET order = CASE id WHEN ... END.
+    model = REORDERABLE_MODELS[kind]
+    payload = request.get_json(silent=True) if request.is_json else None
+    ids = parse_ids(payload.get('ids', []) if isinstance(payload, dict) else request.form.getlist('ids'))
+    existing = set(db.session.execute(select(model.id)).scalars())
+    if set(ids) != existing:
+        return jsonify(error='The ordering must list every id exactly once.'), 400
+    if ids:
+        db.session.execute(
+            update(model)
+            .where(model.id.in_(ids))
+            .values(order=case({id: position for position, id in enumerate(ids, 1)}, value=model.id))
+            .execution_options(synchronize_session=False)
+        )
+        bump_content_version(db.session, [model.__tablename__])
+    db.session.commit()
+    return jsonify(reordered=len(ids))
@@ -0,0 +1,198 @@
+import hashlib
+import json
+from datetime import datetime
+from flask import Blueprint, Response, current_app, request, url_for
+from sqlalchemy import and_, select, tuple_
+from models import db, Project, Skill, Experience, Testimonial, SocialLink, SiteSettings
+from cache import get_content_version
+from snapshot import settings_dict
+from routes.public import PROJECT_ORDER, parse_project_cursor, projects_after
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+api_bp = Blueprint('api', __name__)
+
+API_VERSION = 'v1'
+# URL name: model. Lists are paged by (order, id) through the models'
+# ix_<table>_order_id indexes; projects in the site's order instead.
+API_RESOURCES = {
+    'projects': Project,
+    'skills': Skill,
+    'experiences': Experience,
+    'testimonials': Testimonial,
+    'social-links': SocialLink,
+}
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@api_bp.errorhandler(APIError)
+def api_error(error):
+    response = Response(dumps({'error': error.message}), status=error.status, mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def cached_json(table, build):
+    # The ETag is the table's content version plus the exact URL, so it is
+    # known before any content query runs: a matching If-None-Match is
+    # answered with 304 straight away, and a changed row changes every tag.
+    version = get_content_version(table, ttl=current_app.config.get('CONTENT_VERSION_TTL', 0))
+    digest = hashlib.blake2b(request.full_path.encode(), digest_size=8).hexdigest()
+    etag = f'{API_VERSION}-{table}-{version}-{digest}'
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(dumps(build()), mimetype='application/json')
+    response.set_etag(etag)
+    # Lets the compressor memoize the encoded body like a page-cache hit.
+    response.headers['X-Content-Version'] = str(version)
+    max_age = current_app.config['API_MAX_AGE']
+    shared_max_age = current_app.config['API_SHARED_MAX_AGE']
+    response.headers['Cache-Control'] = (f'public, max-age={max_age}, s-maxage={shared_max_age}, '
+                                         f'stale-while-revalidate={shared_max_age}')
+    origin = current_app.config.get('API_CORS_ORIGIN')
+    if origin:
+        response.headers['Access-Control-Allow-Origin'] = origin
+        response.headers['Access-Control-Expose-Headers'] = 'ETag'
+    return response
+
+
+def selected_columns(model):
+    # ?fields=a,b limits the response to those columns.
+    columns = {column.key: column for column in model.__table__.columns}
+    fields = request.args.get('fields')
+    if not fields:
+        return list(columns.values())
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in columns]
+    if unknown:
+        raise APIError(400, f'Unknown field(s): {", ".join(unknown)}. Available: {", ".join(columns)}')
+    return [columns[name] for name in dict.fromkeys(names)]
+
+
+def keyset(model):
+    # (cursor columns, ORDER BY) of a list.
+    if model is Project:
+        return (Project.order, Project.date_created, Project.id), PROJECT_ORDER
+    return (model.order, model.id), (model.order, model.id)
+
+
+def parse_cursor(model, value):
+    if model is Project:
+        cursor = parse_project_cursor(value)
+    else:
+        try:
+            order, item_id = value.split(':')
+            cursor = int(order), int(item_id)
+        except ValueError:
+            cursor = None
+    if cursor is None:
+        raise APIError(400, 'Invalid cursor')
+    return cursor
+
+
+def format_cursor(model, keys):
+    if model is Project:
+        order, created, project_id = keys
+        return f'{order}_{created.isoformat()}_{project_id}'
+    return ':'.join(map(str, keys))
+
+
+def items_after(model, cursor):
+    if model is Project:
+        return projects_after(cursor)
+    # The leading order >= conjunct starts the index range scan at the cursor.
+    return and_(model.order >= cursor[0], tuple_(model.order, model.id) > cursor)
+
+
+def page_limit():
+    limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise APIError(400, f'limit must be between 1 and {MAX_LIMIT}')
+    return limit
+
+
+@api_bp.route('/')
+def index():
+    return cached_json('site_settings', lambda: {
+        'version': API_VERSION,
+        'resources': {name: url_for('api.list_items', resource=name, _external=True) for name in API_RESOURCES}
+        | {'settings': url_for('api.settings', _external=True)},
+    })
+
+
+@api_bp.route('/<any(projects, skills, experiences, testimonials, "social-links"):resource>')
+def list_items(resource):
+    model = API_RESOURCES[resource]
+    columns = selected_columns(model)
+    limit = page_limit()
+    after = request.args.get('after')
+    cursor = parse_cursor(model, after) if after else None
+
+    def build():
+        keys, order_by = keyset(model)
+        # Labelled so they are not merged with the same columns in ?fields=.
+        labelled = [key.label(f'_key{i}') for i, key in enumerate(keys)]
+        statement = select(*labelled, *columns).order_by(*order_by)
+        if cursor:
+            statement = statement.where(items_after(model, cursor))
+        rows = db.session.execute(statement.limit(limit + 1)).all()
+        data = [dict(zip((column.key for column in columns), row[len(keys):])) for row in rows[:limit]]
+        next_url = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_url = url_for('api.list_items', resource=resource, fields=request.args.get('fields'),
+                               limit=request.args.get('limit'), after=format_cursor(model, last[:len(keys)]),
+                               _external=True)
+        return {'data': data, 'next': next_url}
+
+    return cached_json(model.__tablename__, build)
+
+
+@api_bp.route('/<any(projects, skills, experiences, testimonials, "social-links"):resource>/<int:item_id>')
+def get_item(resource, item_id):
+    model = API_RESOURCES[resource]
+    columns = selected_columns(model)
+
+    def build():
+        row = db.session.execute(select(*columns).where(model.id == item_id)).first()
+        if row is None:
+            raise APIError(404, f'No {resource} item with id {item_id}')
+        return {'data': dict(zip((column.key for column in columns), row))}
+
+    return cached_json(model.__tablename__, build)
+
+
+@api_bp.route('/settings')
+def settings():
+    columns = selected_columns(SiteSettings)
+
+    def build():
+        data = settings_dict(SiteSettings.query.first())
+        return {'data': {column.key: data[column.key] for column in columns}}
+
+    return cached_json('site_settings', build)
+
@@ -1,62 +1,171 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, send_from_directory
-from models import db, Project, Skill, Testimonial, ContactMessage, Experience, SiteSettings, SocialLink
+from urllib.parse import quote
+from flask import Blueprint, render_template, request, flash, redirect, url_for, send_file, make_response, current_app, abort
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file as send_file_header
+from datetime import datetime
+from sqlalchemy import and_, or_, select, tuple_
+from sqlalchemy.orm import selectinload
+from models import db, Project, ContactMessage, SiteSettings, Technology, project_technologies
 from forms import ContactForm
+from cache import page_cache, CachedLookup
+from contact_queue import contact_queue, QueueFull
+from search import search as search_content
+from snapshot import snapshot_store, settings_dict
+from tags import tag_cloud
+from assets import file_hash
 import os
 
 public_bp = Blueprint('public', __name__)
 
-def get_site_settings():
-    settings = SiteSettings.query.first()
-    if not settings:
-        settings = SiteSettings()
-        db.session.add(settings)
-        db.session.commit()
-    return settings
+def _load_site_settings():
+    return settings_dict(SiteSettings.query.first())
+
+# Where a CV may live, relative to the static folder: admin uploads first,
+# then files shipped with the site.
+CV_DIRECTORIES = ('uploads/documents', 'documents')
+
+def _resolve_cv():
+    filename = get_site_settings()['cv_filename']
+    if not filename:
+        return None
+    for directory in CV_DIRECTORIES:
+        path = safe_join(current_app.static_folder, directory, filename)
+        if path and os.path.isfile(path):
+            return {
+                'path': path,
+                'rel_path': f'{directory}/{filename}',
+                'filename': filename,
+                'etag': file_hash(path)[:32],
+            }
+    return {'path': None, 'filename': filename}
 
-def get_social_links():
-    return SocialLink.query.order_by(SocialLink.order).all()
+site_settings_lookup = CachedLookup('site_settings', _load_site_settings)
+# An admin upload changes cv_filename, which moves the site_settings version.
+cv_lookup = CachedLookup('site_settings', _resolve_cv)
+# Tag counts move only when projects change.
+tag_cloud_lookup = CachedLookup('projects', tag_cloud)
+
+def get_site_settings():
+    return site_settings_lookup.get()
 
 @public_bp.route('/')
+@page_cache.cached
 def index():
-    projects = Project.query.order_by(Project.order, Project.date_created.desc()).limit(6).all()
-    skills = Skill.query.order_by(Skill.category, Skill.order).all()
-    experiences = Experience.query.order_by(Experience.order, Experience.id.desc()).all()
-    testimonials = Testimonial.query.order_by(Testimonial.order, Testimonial.date_created.desc()).all()
-    settings = get_site_settings()
-    social_links = get_social_links()
-    
-    skills_by_category = {}
-    for skill in skills:
-        category = skill.category or 'Other'
-        if category not in skills_by_category:
-            skills_by_category[category] = []
-        skills_by_category[category].append(skill)
-    
-    return render_template('public/index.html', 
-                         projects=projects, 
-                         skills_by_category=skills_by_category,
-                         experiences=experiences,
-                         testimonials=testimonials,
-                         settings=settings,
-                         social_links=social_links)
+    snapshot = snapshot_store.get()
+    return render_template('public/index.html', **snapshot)
+
+# Display order of projects; ix_projects_order_date_created_id matches it.
+PROJECT_ORDER = (Project.order, Project.date_created.desc(), Project.id.desc())
+
+def project_cursor(project):
+    return f'{project.order}_{project.date_created.isoformat()}_{project.id}'
+
+def parse_project_cursor(value):
+    try:
+        order, created, project_id = value.split('_')
+        return int(order), datetime.fromisoformat(created), int(project_id)
+    except (AttributeError, ValueError):
+        return None
+
+def projects_after(cursor, inclusive=False):
+    # Projects after the cursor in PROJECT_ORDER (or starting at it).
+    order, created, project_id = cursor
+    rest = tuple_(Project.date_created, Project.id)
+    # The first conjunct is implied by the second, but it is what lets
+    # PostgreSQL start the index range scan at the cursor.
+    return and_(Project.order >= order, or_(
+        Project.order > order,
+        and_(Project.order == order, rest <= (created, project_id) if inclusive else rest < (created, project_id)),
+    ))
+
+def project_page(cursor=None, inclusive=False, technology=None):
+    # One page of projects after the cursor (or starting at it), plus the
+    # cursor of the next page when there is one.
+    per_page = current_app.config['PROJECTS_PER_PAGE']
+    query = Project.query.options(selectinload(Project.tags))
+    if technology is not None:
+        query = query.join(project_technologies, project_technologies.c.project_id == Project.id).filter(
+            project_technologies.c.technology_id == technology.id)
+    if cursor:
+        query = query.filter(projects_after(cursor, inclusive))
+    page = query.order_by(*PROJECT_ORDER).limit(per_page + 1).all()
+    next_cursor = project_cursor(page[per_page - 1]) if len(page) > per_page else None
+    return page[:per_page], next_cursor
+
+def requested_technology():
+    slug = request.args.get('tech')
+    if not slug:
+        return None
+    technology = db.session.execute(select(Technology).where(Technology.slug == slug)).scalar()
+    if technology is None:
+        abort(404)
+    return technology
+
+def render_projects(projects, next_cursor, paged=False, technology=None):
+    return render_template('public/projects.html', projects=projects, next_cursor=next_cursor, paged=paged,
+                           technology=technology, tech=technology.slug if technology else None,
+                           tag_cloud=tag_cloud_lookup.get())
 
 @public_bp.route('/projects')
+@page_cache.cached
 def projects():
-    all_projects = Project.query.order_by(Project.order, Project.date_created.desc()).all()
-    return render_template('public/projects.html', projects=all_projects)
+    # ?after=<cursor> continues the list without JavaScript; ?start=<id>
+    # (used by search results) opens the list at that project; ?tech=<slug>
+    # keeps only projects tagged with that technology.
+    technology = requested_technology()
+    cursor = parse_project_cursor(request.args.get('after'))
+    inclusive = False
+    start = request.args.get('start', type=int)
+    if not cursor and start:
+        project = db.session.get(Project, start)
+        if project is not None:
+            cursor, inclusive = (project.order, project.date_created, project.id), True
+    page, next_cursor = project_page(cursor, inclusive, technology)
+    return render_projects(page, next_cursor, paged=cursor is not None, technology=technology)
+
+@public_bp.route('/projects/page')
+@page_cache.cached
+def projects_page():
+    # HTML fragment with the next page of cards, fetched as the visitor scrolls.
+    technology = requested_technology()
+    cursor = parse_project_cursor(request.args.get('after'))
+    if cursor is None:
+        return '', 400
+    page, next_cursor = project_page(cursor, technology=technology)
+    return render_template('public/_project_page.html', projects=page, next_cursor=next_cursor,
+                           tech=technology.slug if technology else None)
+
+@public_bp.route('/search')
+def search():
+    query = request.args.get('q', '').strip()[:200]
+    page = request.args.get('page', 1, type=int)
+    page = min(max(page, 1), 100)
+    results, has_next = [], False
+    if query:
+        results, has_next = search_content(query, page, current_app.config['SEARCH_RESULTS_PER_PAGE'])
+    return render_template('public/search.html', query=query, results=results, page=page, has_next=has_next)
 
 @public_bp.route('/contact', methods=['GET', 'POST'])
 def contact():
     form = ContactForm()
     if form.validate_on_submit():
-        message = ContactMessage(
-            name=form.name.data,
-            email=form.email.data,
-            subject=form.subject.data,
-            message=form.message.data
-        )
-        db.session.add(message)
-        db.session.commit()
+        if contact_queue.enabled:
+            try:
+                contact_queue.enqueue(form.name.data, form.email.data, form.subject.data, form.message.data)
+            except QueueFull:
+                flash('We are receiving a lot of messages right now. Please try again in a minute.', 'danger')
+                response = make_response(render_template('public/contact.html', form=form), 503)
+                response.headers['Retry-After'] = '60'
+                return response
+        else:
+            message = ContactMessage(
+                name=form.name.data,
+                email=form.email.data,
+                subject=form.subject.data,
+                message=form.message.data
+            )
+            db.session.add(message)
+            db.session.commit()
         flash('Thank you! Your message has been received. I will get back to you soon.', 'success')
         return redirect(url_for('public.contact'))
     
@@ -64,23 +173,39 @@ def contact():
 
 @public_bp.route('/download-cv')
 def download_cv():
-    settings = get_site_settings()
+    cv = cv_lookup.get()
     
-    if not settings.cv_filename:
+    if cv is None:
         flash('CV file not available for download.', 'info')
         return redirect(url_for('public.index'))
     
-    upload_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'uploads', 'documents')
-    upload_path = os.path.join(upload_dir, settings.cv_filename)
-    
-    if os.path.exists(upload_path):
-        return send_from_directory(upload_dir, settings.cv_filename, as_attachment=True)
-    
-    static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'documents')
-    static_path = os.path.join(static_dir, settings.cv_filename)
-    
-    if os.path.exists(static_path):
-        return send_from_directory(static_dir, settings.cv_filename, as_attachment=True)
+    if cv['path'] is None:
+        flash('CV file not found.', 'danger')
+        return redirect(url_for('public.index'))
     
-    flash('CV file not found.', 'danger')
-    return redirect(url_for('public.index'))
+    mode = current_app.config.get('CV_SENDFILE')
+    try:
+        if mode in ('x-accel-redirect', 'x-sendfile'):
+            return _offloaded_cv(cv, mode)
+        # Conditional: ETag/Last-Modified, 304 and Range requests.
+        return send_file(cv['path'], as_attachment=True, download_name=cv['filename'], etag=cv['etag'])
+    except FileNotFoundError:
+        cv_lookup.clear()
+        flash('CV file not found.', 'danger')
+        return redirect(url_for('public.index'))
+
+def _offloaded_cv(cv, mode):
+    # The front-end server sends the bytes and answers Range requests itself;
+    # the app only answers conditional requests and names the file.
+    environ = {key: value for key, value in request.environ.items() if key not in ('HTTP_RANGE', 'HTTP_IF_RANGE')}
+    response = send_file_header(
+        cv['path'], environ, as_attachment=True, download_name=cv['filename'],
+        etag=cv['etag'], use_x_sendfile=True,
+    )
+    if response.status_code != 200:
+        del response.headers['X-Sendfile']
+    elif mode == 'x-accel-redirect':
+        del response.headers['X-Sendfile']
+        prefix = current_app.config.get('CV_ACCEL_PREFIX', '/internal-static/')
+        response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(cv['rel_path'])
+    return response
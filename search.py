@@ -0,0 +1,163 @@
+import re
+from flask import url_for
+from markupsafe import Markup, escape
+from sqlalchemy import DDL, delete, event, insert, text
+from sqlalchemy.orm import Session
+from models import db, Project, Experience, Skill, Testimonial, SearchDocument
+
+# Every searchable row is mirrored into search_documents by a flush hook. On
+# PostgreSQL the table carries a generated, weighted tsvector column with a GIN
+# index; on SQLite an external-content FTS5 table is kept in sync by triggers.
+INDEXED_MODELS = {
+    Project: ('project', lambda p: (p.title, _join(p.description, p.technologies))),
+    Experience: ('experience', lambda e: (f'{e.title} at {e.company}', _join(e.description, e.location))),
+    Skill: ('skill', lambda s: (s.name, s.category or '')),
+    Testimonial: ('testimonial', lambda t: (t.name, _join(t.role, t.company, t.message))),
+}
+
+# Sentinels that survive HTML escaping and are swapped for <mark> afterwards.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+_table = SearchDocument.__table__
+
+for statement in (
+    "ALTER TABLE search_documents ADD COLUMN tsv tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(body, '')), 'B')) STORED",
+    "CREATE INDEX ix_search_documents_tsv ON search_documents USING GIN (tsv)",
+):
+    event.listen(_table, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+for statement in (
+    "CREATE VIRTUAL TABLE search_fts USING fts5("
+    "title, body, content='search_documents', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+):
+    event.listen(_table, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(_table, 'before_drop', DDL('DROP TABLE IF EXISTS search_fts').execute_if(dialect='sqlite'))
+
+POSTGRES_QUERY = text("""
+    SELECT d.kind, d.ref_id, d.title,
+           ts_headline('english', d.body, q,
+                       'MaxFragments=2, MaxWords=30, MinWords=10, StartSel=' || chr(2) || ', StopSel=' || chr(3)) AS snippet
+    FROM search_documents d, websearch_to_tsquery('english', :query) q
+    WHERE d.tsv @@ q
+    ORDER BY ts_rank_cd(d.tsv, q) DESC, d.id
+    LIMIT :limit OFFSET :offset
+""")
+
+SQLITE_QUERY = text("""
+    SELECT d.kind, d.ref_id, d.title,
+           snippet(search_fts, 1, char(2), char(3), '...', 24) AS snippet
+    FROM search_fts
+    JOIN search_documents d ON d.id = search_fts.rowid
+    WHERE search_fts MATCH :query
+    ORDER BY bm25(search_fts, 10.0, 1.0), d.id
+    LIMIT :limit OFFSET :offset
+""")
+
+
+def _join(*parts):
+    return '\n'.join(part for part in parts if part)
+
+
+def _document(obj):
+    kind, extract = INDEXED_MODELS[type(obj)]
+    title, body = extract(obj)
+    return {'kind': kind, 'ref_id': obj.id, 'title': (title or '')[:300], 'body': body or ''}
+
+
+def _remove(session, kind, ref_ids):
+    session.execute(delete(SearchDocument).where(
+        SearchDocument.kind == kind, SearchDocument.ref_id.in_(ref_ids)
+    ).execution_options(synchronize_session=False))
+
+
+def _after_flush(session, flush_context):
+    changed = [obj for obj in session.new | session.dirty if type(obj) in INDEXED_MODELS]
+    deleted = [obj for obj in session.deleted if type(obj) in INDEXED_MODELS]
+    if not changed and not deleted:
+        return
+
+    by_kind = {}
+    for obj in changed + deleted:
+        by_kind.setdefault(INDEXED_MODELS[type(obj)][0], []).append(obj.id)
+    for kind, ref_ids in by_kind.items():
+        _remove(session, kind, ref_ids)
+    if changed:
+        session.execute(insert(SearchDocument), [_document(obj) for obj in changed])
+
+
+def reindex_all(commit=True):
+    # For bulk loads that bypass the flush hook (populate_db.py).
+    db.session.execute(delete(SearchDocument))
+    for model in INDEXED_MODELS:
+        documents = []
+        for obj in model.query.yield_per(500):
+            documents.append(_document(obj))
+            if len(documents) == 500:
+                db.session.execute(insert(SearchDocument), documents)
+                documents = []
+        if documents:
+            db.session.execute(insert(SearchDocument), documents)
+    if commit:
+        db.session.commit()
+
+
+def _fts5_query(query):
+    # Quote every word so user input cannot inject FTS5 syntax; match prefixes.
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+
+def _highlight(value):
+    html = str(escape(value or ''))
+    return Markup(html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>'))
+
+
+def result_url(kind, ref_id):
+    if kind == 'project':
+        return url_for('public.projects', start=ref_id, _anchor=f'project-{ref_id}')
+    return url_for('public.index', _anchor={
+        'experience': 'experience',
+        'skill': 'skills',
+        'testimonial': 'testimonials',
+    }[kind])
+
+
+def search(query, page=1, per_page=10):
+    # Returns (results, has_next) for the given 1-based page.
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        statement, params = POSTGRES_QUERY, {'query': query}
+    elif dialect == 'sqlite':
+        match = _fts5_query(query)
+        if not match:
+            return [], False
+        statement, params = SQLITE_QUERY, {'query': match}
+    else:
+        raise RuntimeError(f'Full-text search is not supported on {dialect}')
+
+    params.update(limit=per_page + 1, offset=(page - 1) * per_page)
+    rows = db.session.execute(statement, params).mappings().all()
+    results = [
+        {
+            'kind': row['kind'],
+            'title': row['title'],
+            'snippet': _highlight(row['snippet']),
+            'url': result_url(row['kind'], row['ref_id']),
+        }
+        for row in rows[:per_page]
+    ]
+    return results, len(rows) > per_page
+
+
+def init_search(app):
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
@@ -0,0 +1,143 @@
+import json
+from datetime import datetime
+from threading import Lock
+from flask import g
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+from models import db, Project, Skill, Experience, Testimonial, SiteSettings, SocialLink, PortfolioSnapshot
+from cache import GLOBAL_VERSION, get_content_version, read_content_version
+
+# Everything the homepage renders, serialized into a single row so a public
+# request costs one primary-key read instead of six queries.
+SNAPSHOT_ID = 1
+HOMEPAGE_PROJECT_LIMIT = 6
+
+
+def row_dict(obj):
+    data = {}
+    for column in obj.__table__.columns:
+        value = getattr(obj, column.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        data[column.key] = value
+    return data
+
+
+def project_dict(project):
+    data = row_dict(project)
+    data['tags'] = [{'name': tag.name, 'slug': tag.slug} for tag in project.tags]
+    return data
+
+
+def settings_dict(settings):
+    if settings is not None:
+        return row_dict(settings)
+    # No settings row yet: fall back to the column defaults without writing.
+    return {
+        column.key: column.default.arg if column.default is not None else None
+        for column in SiteSettings.__table__.columns
+    }
+
+
+def build_snapshot():
+    projects = (Project.query.options(selectinload(Project.tags))
+                .order_by(Project.order, Project.date_created.desc(), Project.id.desc())
+                .limit(HOMEPAGE_PROJECT_LIMIT).all())
+    skills = Skill.query.order_by(Skill.category, Skill.order).all()
+    experiences = Experience.query.order_by(Experience.order, Experience.id.desc()).all()
+    testimonials = Testimonial.query.order_by(Testimonial.order, Testimonial.date_created.desc()).all()
+    social_links = SocialLink.query.order_by(SocialLink.order).all()
+
+    skills_by_category = {}
+    for skill in skills:
+        category = skill.category or 'Other'
+        skills_by_category.setdefault(category, []).append(row_dict(skill))
+
+    return {
+        'projects': [project_dict(p) for p in projects],
+        'skills_by_category': skills_by_category,
+        'experiences': [row_dict(e) for e in experiences],
+        'testimonials': [row_dict(t) for t in testimonials],
+        'settings': settings_dict(SiteSettings.query.first()),
+        'social_links': [row_dict(s) for s in social_links],
+    }
+
+
+def store_snapshot(session, version, data):
+    row = session.get(PortfolioSnapshot, SNAPSHOT_ID)
+    if row is None:
+        row = PortfolioSnapshot(id=SNAPSHOT_ID)
+        session.add(row)
+    row.version = version
+    row.data = json.dumps(data, separators=(',', ':'))
+    return row
+
+
+class SnapshotStore:
+    def __init__(self, app=None):
+        self._lock = Lock()
+        self._version = None
+        self._data = None
+        self.version_ttl = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.version_ttl = app.config.get('CONTENT_VERSION_TTL', 0)
+        if not event.contains(Session, 'before_commit', _before_commit):
+            event.listen(Session, 'before_commit', _before_commit)
+            event.listen(Session, 'after_commit', _after_commit)
+            event.listen(Session, 'after_soft_rollback', _after_soft_rollback)
+        app.extensions['portfolio_snapshot'] = self
+
+    def remember(self, version, data):
+        with self._lock:
+            self._version = version
+            self._data = data
+
+    def get(self, version=None):
+        if version is None:
+            version = g.get('content_version')
+        if version is None:
+            version = get_content_version(ttl=self.version_ttl)
+        with self._lock:
+            if self._version == version:
+                return self._data
+
+        row = db.session.get(PortfolioSnapshot, SNAPSHOT_ID)
+        if row is not None and row.version == version:
+            data = json.loads(row.data)
+        else:
+            # Missing or behind (e.g. created before this table existed):
+            # rebuild for this worker only. A public GET never writes; the
+            # row is stored by the next commit that bumps the content version.
+            data = build_snapshot()
+        self.remember(version, data)
+        return data
+
+
+def _before_commit(session):
+    if not (session.info.get('content_bumped') or session.new or session.dirty or session.deleted):
+        return
+    # Flush hooks may bump the content version, so flush before checking.
+    session.flush()
+    if not session.info.get('content_bumped'):
+        return
+    # Not the per-worker memo: it may still hold the version before this bump.
+    version = read_content_version(session, GLOBAL_VERSION)
+    data = build_snapshot()
+    store_snapshot(session, version, data)
+    session.info['pending_snapshot'] = (version, data)
+
+
+def _after_commit(session):
+    pending = session.info.pop('pending_snapshot', None)
+    if pending is not None:
+        snapshot_store.remember(*pending)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    session.info.pop('pending_snapshot', None)
+
+
+snapshot_store = SnapshotStore()
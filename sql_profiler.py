@@ -0,0 +1,165 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from logging.handlers import WatchedFileHandler
+from flask import request
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('sql.profiler')
+slow_logger = logging.getLogger('sql.slow')
+
+PROFILE_HEADER = 'X-Profile-SQL'
+BASE_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_THIS_FILE = os.path.abspath(__file__)
+
+_local = threading.local()
+_settings = {'slow_seconds': 0.1, 'repeat_threshold': 5}
+
+
+def statement_shape(statement):
+    # Collapse literals and IN-lists so one lazy load per row maps to a
+    # single shape however many rows there are.
+    shape = re.sub(r"'(?:[^']|'')*'", '?', statement)
+    shape = re.sub(r'\b\d+(?:\.\d+)?\b', '?', shape)
+    shape = re.sub(r'%\(\w+\)s|:\w+|\$\d+|%s', '?', shape)
+    shape = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(?)', shape)
+    return re.sub(r'\s+', ' ', shape).strip()
+
+
+def statement_origin():
+    # The innermost frame of this project's own code that issued the query.
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(BASE_DIR) and filename != _THIS_FILE and f'{os.sep}site-packages{os.sep}' not in filename:
+            return f'{os.path.relpath(filename, BASE_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._profiler_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_profiler_start', None)
+    if start is None:
+        return
+    duration = time.perf_counter() - start
+    state = getattr(_local, 'state', None)
+    slow = duration >= _settings['slow_seconds'] > 0
+    origin = statement_origin() if slow or (state and state['profile']) else None
+    if state is not None:
+        state['count'] += 1
+        state['seconds'] += duration
+        if state['profile']:
+            state['statements'].append((statement, duration, origin))
+    if slow:
+        slow_logger.warning('%.1f ms %s [%s] %s', duration * 1000,
+                            request.path if state is not None else '-', origin, ' '.join(statement.split()))
+
+
+def request_queries():
+    # (statements, seconds) of the current request so far, shared with the
+    # metrics so each statement is timed once.
+    state = getattr(_local, 'state', None)
+    if state is None:
+        return None
+    return state['count'], state['seconds']
+
+
+def analyze(statements, repeat_threshold):
+    # Returns (repeated, slow): shapes run at least repeat_threshold times,
+    # with their count, total time and origins, and the slow statements.
+    shapes = {}
+    for statement, duration, origin in statements:
+        entry = shapes.setdefault(statement_shape(statement), {'count': 0, 'seconds': 0.0, 'origins': set()})
+        entry['count'] += 1
+        entry['seconds'] += duration
+        entry['origins'].add(origin)
+    repeated = {shape: entry for shape, entry in shapes.items() if entry['count'] >= repeat_threshold}
+    slow = [(statement, duration, origin) for statement, duration, origin in statements
+            if duration >= _settings['slow_seconds'] > 0]
+    return repeated, slow
+
+
+class SQLProfiler:
+    def __init__(self, app=None):
+        self.always = False
+        self.allow_header = True
+        self.server_timing = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.always = app.config.get('SQL_PROFILER_ENABLED', False)
+        self.allow_header = app.config.get('SQL_PROFILER_HEADER', True)
+        self.server_timing = app.config.get('SQL_SERVER_TIMING', False)
+        _settings['slow_seconds'] = app.config.get('SQL_SLOW_QUERY_MS', 100) / 1000
+        _settings['repeat_threshold'] = app.config.get('SQL_REPEAT_THRESHOLD', 5)
+        log_path = app.config.get('SQL_SLOW_QUERY_LOG')
+        if log_path and not slow_logger.handlers:
+            handler = WatchedFileHandler(log_path)
+            handler.setFormatter(logging.Formatter('%(asctime)s [%(process)d] %(message)s'))
+            slow_logger.addHandler(handler)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.extensions['sql_profiler'] = self
+
+    def _profiling_requested(self):
+        # Admins can profile a single request with the X-Profile-SQL header.
+        return (self.allow_header and request.headers.get(PROFILE_HEADER) == '1'
+                and current_user.is_authenticated)
+
+    def _before_request(self):
+        _local.state = {
+            'start': time.perf_counter(),
+            'count': 0,
+            'seconds': 0.0,
+            'profile': False,
+            'statements': [],
+        }
+        _local.state['profile'] = self.always or self._profiling_requested()
+
+    def _after_request(self, response):
+        state = getattr(_local, 'state', None)
+        if state is None:
+            return response
+        if state['profile']:
+            self._report(state, response)
+        if self.server_timing or state['profile']:
+            elapsed = time.perf_counter() - state['start']
+            response.headers.add('Server-Timing', f'db;dur={state["seconds"] * 1000:.1f};desc="{state["count"]} queries"')
+            response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.1f}')
+        return response
+
+    def _report(self, state, response):
+        repeated, slow = analyze(state['statements'], _settings['repeat_threshold'])
+        response.headers['X-SQL-Profile'] = (f'queries={state["count"]}; ms={state["seconds"] * 1000:.1f}; '
+                                             f'repeated={len(repeated)}; slow={len(slow)}')
+        level = logging.WARNING if repeated or slow else logging.INFO
+        lines = [f'{request.method} {request.path}: {state["count"]} queries in {state["seconds"] * 1000:.1f} ms']
+        for shape, entry in sorted(repeated.items(), key=lambda item: -item[1]['count']):
+            lines.append(f'  possible N+1: {entry["count"]}x ({entry["seconds"] * 1000:.1f} ms) from '
+                         f'{", ".join(sorted(entry["origins"]))}: {shape[:300]}')
+        for statement, duration, origin in slow:
+            lines.append(f'  slow: {duration * 1000:.1f} ms from {origin}: {" ".join(statement.split())[:300]}')
+        if level == logging.INFO:
+            for statement, duration, origin in state['statements']:
+                lines.append(f'  {duration * 1000:.1f} ms {origin}: {" ".join(statement.split())[:200]}')
+        logger.log(level, '\n'.join(lines))
+
+    def _teardown_request(self, exc):
+        _local.state = None
+
+
+sql_profiler = SQLProfiler()
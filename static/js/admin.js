@@ -0,0 +1,64 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Drag-and-drop reordering: children of [data-reorder-url] that carry a
+    // data-id can be dragged; "Save order" posts the full ordering at once.
+    document.querySelectorAll('[data-reorder-url]').forEach(function(list) {
+        let dragged = null;
+        const save = document.createElement('button');
+        save.type = 'button';
+        save.className = 'hidden mt-4 bg-cyan-500 hover:bg-cyan-600 text-gray-900 font-bold py-2 px-6 rounded-lg transition';
+        save.textContent = 'Save order';
+        (list.closest('table') || list).insertAdjacentElement('afterend', save);
+
+        list.querySelectorAll(':scope > [data-id]').forEach(function(item) {
+            item.draggable = true;
+            item.classList.add('cursor-move');
+            item.addEventListener('dragstart', function(event) {
+                dragged = item;
+                event.dataTransfer.effectAllowed = 'move';
+                item.classList.add('opacity-50');
+            });
+            item.addEventListener('dragend', function() {
+                item.classList.remove('opacity-50');
+                dragged = null;
+            });
+            item.addEventListener('dragover', function(event) {
+                if (!dragged || dragged === item) {
+                    return;
+                }
+                event.preventDefault();
+                const box = item.getBoundingClientRect();
+                const after = event.clientY > box.top + box.height / 2;
+                list.insertBefore(dragged, after ? item.nextSibling : item);
+                save.classList.remove('hidden');
+            });
+        });
+
+        save.addEventListener('click', function() {
+            const ids = Array.from(list.querySelectorAll(':scope > [data-id]'), item => Number(item.dataset.id));
+            save.disabled = true;
+            fetch(list.dataset.reorderUrl, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json', 'X-CSRFToken': list.dataset.csrfToken},
+                body: JSON.stringify({ids: ids}),
+            }).then(function(response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                window.location.reload();
+            }).catch(function() {
+                save.disabled = false;
+                alert('Could not save the new order. Reload the page and try again.');
+            });
+        });
+    });
+
+    // Bulk message actions: the "select all" box toggles every row checkbox.
+    const selectAll = document.getElementById('select-all-messages');
+    if (selectAll) {
+        selectAll.addEventListener('change', function() {
+            document.querySelectorAll('input[name="ids"][form="bulk-messages"]').forEach(function(box) {
+                box.checked = selectAll.checked;
+            });
+        });
+    }
+});
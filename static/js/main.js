@@ -110,4 +110,46 @@ document.addEventListener('DOMContentLoaded', function() {
     skillBars.forEach(element => {
         skillObserver.observe(element);
     });
+    
+    // Infinite scroll on /projects: when the "More projects" block comes into
+    // view, fetch the next page of cards and swap in the block that follows it.
+    const projectList = document.getElementById('project-list');
+    if (projectList && 'IntersectionObserver' in window) {
+        const moreObserver = new IntersectionObserver(function(entries) {
+            entries.forEach(entry => {
+                if (!entry.isIntersecting) {
+                    return;
+                }
+                const more = entry.target;
+                moreObserver.unobserve(more);
+                fetch(more.dataset.nextPage)
+                    .then(response => {
+                        if (!response.ok) {
+                            throw new Error(response.statusText);
+                        }
+                        return response.text();
+                    })
+                    .then(html => {
+                        const fragment = document.createElement('template');
+                        fragment.innerHTML = html;
+                        const next = fragment.content.querySelector('[data-next-page]');
+                        if (next) {
+                            next.remove();
+                        }
+                        projectList.append(fragment.content);
+                        if (next) {
+                            more.replaceWith(next);
+                            moreObserver.observe(next);
+                        } else {
+                            more.remove();
+                        }
+                    })
+                    .catch(() => {
+                        // Leave the plain "More projects" link to fall back on.
+                    });
+            });
+        }, { rootMargin: '600px 0px' });
+        
+        document.querySelectorAll('[data-next-page]').forEach(element => moreObserver.observe(element));
+    }
 });
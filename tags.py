@@ -0,0 +1,122 @@
+import re
+from sqlalchemy import delete, event, func, inspect, insert, select, update
+from sqlalchemy.orm import Session
+from models import db, Project, Technology, project_technologies
+
+# Project.technologies stays the editable comma-separated text; a flush hook
+# mirrors it into technologies/project_technologies so projects can be
+# filtered by tag through an index, and keeps Technology.project_count current.
+TAG_CLOUD_SIZE = 30
+BATCH_SIZE = 1000
+
+
+def slugify(name):
+    slug = name.lower().replace('+', '-plus').replace('#', '-sharp')
+    return re.sub(r'[^a-z0-9]+', '-', slug).strip('-')[:100]
+
+
+def parse_technologies(text):
+    # {slug: name} in the order written; repeats (by slug) are dropped.
+    tags = {}
+    for name in (text or '').split(','):
+        name = name.strip()[:100]
+        slug = slugify(name)
+        if slug and slug not in tags:
+            tags[slug] = name
+    return tags
+
+
+def _recount(session, technology_ids):
+    linked = (select(func.count())
+              .select_from(project_technologies)
+              .where(project_technologies.c.technology_id == Technology.id)
+              .scalar_subquery())
+    statement = update(Technology).values(project_count=linked).execution_options(synchronize_session=False)
+    if technology_ids is not None:
+        statement = statement.where(Technology.id.in_(technology_ids))
+    session.execute(statement)
+
+
+def _before_flush(session, flush_context, instances):
+    changed = [obj for obj in session.new if isinstance(obj, Project)]
+    changed += [obj for obj in session.dirty
+                if isinstance(obj, Project) and inspect(obj).attrs.technologies.history.has_changes()]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Project)]
+    if not changed and not deleted:
+        return
+
+    affected = session.info.setdefault('tags_affected', set())
+    with session.no_autoflush:
+        wanted = {}
+        for project in changed:
+            wanted.update(parse_technologies(project.technologies))
+        existing = {}
+        if wanted:
+            existing = {tag.slug: tag for tag in session.execute(
+                select(Technology).where(Technology.slug.in_(list(wanted)))
+            ).scalars()}
+        for slug, name in wanted.items():
+            if slug not in existing:
+                existing[slug] = Technology(name=name, slug=slug, project_count=0)
+                session.add(existing[slug])
+
+        for project in deleted:
+            affected.update(project.tags)
+        for project in changed:
+            affected.update(project.tags)
+            project.tags = [existing[slug] for slug in parse_technologies(project.technologies)]
+            affected.update(project.tags)
+
+
+def _after_flush(session, flush_context):
+    affected = session.info.pop('tags_affected', None)
+    if affected:
+        _recount(session, [tag.id for tag in affected if tag.id is not None])
+
+
+def rebuild_tags(commit=True):
+    # For bulk loads that bypass the flush hook (populate_db.py,
+    # data_transfer.py), and the one-off migration of existing projects.
+    db.session.execute(delete(project_technologies))
+    db.session.execute(delete(Technology))
+
+    names = {}
+    for (text,) in db.session.execute(select(Project.technologies).execution_options(yield_per=BATCH_SIZE)):
+        for slug, name in parse_technologies(text).items():
+            names.setdefault(slug, name)
+    if names:
+        db.session.execute(insert(Technology), [
+            {'name': name, 'slug': slug, 'project_count': 0} for slug, name in names.items()
+        ])
+    ids = dict(db.session.execute(select(Technology.slug, Technology.id)).all())
+
+    links = []
+    rows = db.session.execute(select(Project.id, Project.technologies).execution_options(yield_per=BATCH_SIZE))
+    for project_id, text in rows:
+        links.extend({'project_id': project_id, 'technology_id': ids[slug]} for slug in parse_technologies(text))
+        if len(links) >= BATCH_SIZE:
+            db.session.execute(insert(project_technologies), links)
+            links = []
+    if links:
+        db.session.execute(insert(project_technologies), links)
+    _recount(db.session, None)
+    if commit:
+        db.session.commit()
+
+
+def tag_cloud():
+    # The most used technologies, alphabetically, for the projects page.
+    top = db.session.execute(
+        select(Technology.name, Technology.slug, Technology.project_count)
+        .where(Technology.project_count > 0)
+        .order_by(Technology.project_count.desc(), Technology.name)
+        .limit(TAG_CLOUD_SIZE)
+    ).all()
+    return sorted(({'name': name, 'slug': slug, 'count': count} for name, slug, count in top),
+                  key=lambda tag: tag['name'].lower())
+
+
+def init_tags(app):
+    if not event.contains(Session, 'before_flush', _before_flush):
+        event.listen(Session, 'before_flush', _before_flush)
+        event.listen(Session, 'after_flush', _after_flush)
@@ -0,0 +1,48 @@
+import logging
+import os
+import time
+from jinja2 import FileSystemBytecodeCache, MemcachedBytecodeCache
+
+try:
+    from pymemcache.client.base import Client as MemcacheClient
+except ImportError:
+    MemcacheClient = None
+
+logger = logging.getLogger(__name__)
+
+
+def _bytecode_cache(app):
+    kind = app.config.get('JINJA_BYTECODE_CACHE', 'filesystem')
+    if kind == 'memcached':
+        server = app.config.get('JINJA_BYTECODE_CACHE_SERVER', 'localhost:11211')
+        if MemcacheClient is not None:
+            host, _, port = server.partition(':')
+            client = MemcacheClient((host, int(port or 11211)), connect_timeout=1, timeout=1)
+            # Keys carry a hash of the template source, so entries never go stale.
+            return MemcachedBytecodeCache(client, prefix='portfolio/jinja/', ignore_memcache_errors=True)
+        logger.warning('pymemcache is not installed (pip install -e .[templates]); '
+                       'using the filesystem Jinja bytecode cache')
+        kind = 'filesystem'
+    if kind == 'filesystem':
+        directory = app.config.get('JINJA_BYTECODE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+        os.makedirs(directory, exist_ok=True)
+        return FileSystemBytecodeCache(directory)
+    return None
+
+
+def warm_templates(app):
+    # Compile every template now so requests never pay for it. Under
+    # gunicorn --preload this runs once in the master and the compiled
+    # templates are shared copy-on-write with the forked workers.
+    start = time.perf_counter()
+    names = [name for name in app.jinja_env.list_templates() if name.endswith('.html')]
+    for name in names:
+        app.jinja_env.get_template(name)
+    logger.info('Compiled %d templates in %.3fs', len(names), time.perf_counter() - start)
+    return names
+
+
+def init_templates(app):
+    app.jinja_env.bytecode_cache = _bytecode_cache(app)
+    if app.config.get('JINJA_WARMUP', True):
+        warm_templates(app)